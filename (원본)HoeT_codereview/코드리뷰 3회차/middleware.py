@@ -0,0 +1,267 @@
+# N+1 자동 탐지: 요청마다 쿼리 수 / DB 시간 / 같은 SQL 반복 횟수를 세서 예산 초과 시 경고
+# 2회_장고객체지향/oop4.py 의 SimpleMiddleware 구조 그대로 (__init__ + __call__)
+#
+# settings.py
+#   MIDDLEWARE = [..., 'app.middleware.QueryBudgetMiddleware']
+#   QUERY_BUDGET = {'MAX_QUERIES': 50, 'MAX_DB_MS': 200, 'MAX_DUPLICATES': 5, 'RAISE': False}
+#   테스트 설정에서 'RAISE': True → view1.py 같은 N+1 회귀가 테스트 실패로 드러남
+import bisect
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = {'MAX_QUERIES': 50, 'MAX_DB_MS': 200, 'MAX_DUPLICATES': 5, 'RAISE': False}
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql: str) -> str:
+    """파라미터만 다른 SQL을 같은 것으로 묶음: WHERE id = %s / IN (%s, %s, ...) / 리터럴"""
+    sql = _IN_LIST.sub("(...)", sql)
+    sql = _LITERAL.sub("?", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """connection.execute_wrapper 로 끼워 넣는 카운터"""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # 초
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, threshold=2):
+        """같은 모양 SQL이 threshold번 이상 → N+1 후보 (많은 순)"""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+
+def _budget(**overrides):
+    return {**DEFAULT_BUDGET, **getattr(settings, 'QUERY_BUDGET', {}), **overrides}
+
+
+def _violations(stats: QueryStats, budget) -> list[str]:
+    problems = []
+    if stats.count > budget['MAX_QUERIES']:
+        problems.append(f"queries={stats.count} > {budget['MAX_QUERIES']}")
+    if stats.duration * 1000 > budget['MAX_DB_MS']:
+        problems.append(f"db_ms={stats.duration * 1000:.1f} > {budget['MAX_DB_MS']}")
+    for fp, n in stats.duplicates(budget['MAX_DUPLICATES'] + 1)[:3]:
+        problems.append(f"duplicate x{n}: {fp[:200]}")
+    return problems
+
+
+@contextmanager
+def track_queries():
+    """모든 DB 연결에 카운터를 붙임 (현재 스레드 연결만 해당)"""
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(stats))
+        yield stats
+
+
+@contextmanager
+def query_budget(**overrides):
+    """
+    테스트용: 블록 안 쿼리가 예산을 넘으면 QueryBudgetExceeded
+    ex) with query_budget(MAX_QUERIES=2): client.get('/comments/')
+    """
+    budget = _budget(**overrides)
+    with track_queries() as stats:
+        yield stats
+    problems = _violations(stats, budget)
+    if problems:
+        raise QueryBudgetExceeded('; '.join(problems))
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budget = _budget()
+
+    def __call__(self, request):
+        with track_queries() as stats:
+            response = self.get_response(request)
+        # 주의: StreamingHttpResponse 본문 생성 중 쿼리는 여기서 안 잡힘
+
+        response['X-DB-Queries'] = str(stats.count)
+        problems = _violations(stats, self.budget)
+        if problems:
+            logger.warning("[쿼리 예산 초과] %s %s: %s", request.method, request.path, '; '.join(problems))
+            if self.budget['RAISE']:
+                raise QueryBudgetExceeded(f"{request.path}: {'; '.join(problems)}")
+        return response
+
+
+# ----- 요청 타이밍 -----
+# settings.py
+#   MIDDLEWARE = ['app.middleware.RequestTimingMiddleware', ...]  (가장 바깥에 둘 것)
+#   REQUEST_TIMING = {'SAMPLE_RATE': 0.01}
+#   urls.py: path('internal/timings/', timing_stats_view)
+#
+# - 모든 요청: 뷰별 지연시간 히스토그램 버킷 하나 +1 (고정 개수 샤드 저장소 → 락 없음)
+# - SAMPLE_RATE 비율 요청만: 구간별 분해 (미들웨어 / 뷰 / DB / 렌더·직렬화 / 응답 미들웨어)
+#   샘플링은 난수 대신 스레드별 카운터 (N번째 요청마다)
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'))
+BREAKDOWN = ('pre_view', 'view', 'db', 'render', 'post_view')
+SHARDS = 64
+
+# 스레드마다 저장소를 등록하면 스레드-per-요청 서버에서 등록 락 + 죽은 스레드 dict가 계속 쌓임
+# → 고정 샤드에 라운드로빈 배정 (메모리 상한 고정, 등록 락 없음).
+# 샤드를 공유하는 스레드끼리 += 가 드물게 유실될 수 있음 (통계용 근사치로 허용)
+_shards = [({}, {}) for _ in range(SHARDS)]  # (view_name -> [버킷별 건수], view_name -> [샘플 수, *BREAKDOWN 합계(ms)])
+_next_shard = itertools.count()  # next()는 GIL 아래 원자적
+
+
+class _ThreadTimings(threading.local):
+    def __init__(self):
+        self.hists, self.samples = _shards[next(_next_shard) % SHARDS]
+        self.counter = 0
+
+_timings = _ThreadTimings()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'  # 경로를 키로 쓰면 카디널리티 폭증
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        rate = getattr(settings, 'REQUEST_TIMING', {}).get('SAMPLE_RATE', 0.01)
+        self.sample_every = max(1, round(1 / rate)) if rate > 0 else 0
+
+    def __call__(self, request):
+        local = _timings
+        local.counter += 1
+        if self.sample_every and local.counter % self.sample_every == 0:
+            return self._sampled(request, local)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(local, _view_name(request), time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _observe(local, name, seconds):
+        hist = local.hists.get(name)
+        if hist is None:
+            hist = local.hists[name] = [0] * len(LATENCY_BUCKETS_MS)
+        hist[bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+
+    def _sampled(self, request, local):
+        marks = request._timing_marks = {'start': time.perf_counter()}
+        with track_queries() as stats:
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        name = _view_name(request)
+        self._observe(local, name, end - marks['start'])
+        view_start = marks.get('view_start', end)
+        # 일반 HttpResponse는 뷰 종료 시점을 알 수 없음 → 응답 미들웨어까지 view에 포함
+        view_end = marks.get('view_end', end)
+        render_end = marks.get('render_end', view_end)
+        parts = (
+            view_start - marks['start'],  # 요청 미들웨어 + URL 해석
+            view_end - view_start,        # 뷰 (DB 포함)
+            stats.duration,               # DB
+            render_end - view_end,        # 템플릿 렌더 / DRF 직렬화
+            end - render_end,             # 응답 미들웨어
+        )
+        acc = local.samples.get(name)
+        if acc is None:
+            acc = local.samples[name] = [0] + [0.0] * len(BREAKDOWN)
+        acc[0] += 1
+        for i, sec in enumerate(parts, 1):
+            acc[i] += sec * 1000
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        marks = getattr(request, '_timing_marks', None)
+        if marks is not None:
+            marks['view_start'] = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # TemplateResponse / DRF Response: 뷰는 끝났고 렌더는 아직 → 렌더 끝은 post-render 콜백으로
+        marks = getattr(request, '_timing_marks', None)
+        if marks is not None:
+            marks['view_end'] = time.perf_counter()
+            response.add_post_render_callback(lambda r: marks.__setitem__('render_end', time.perf_counter()))
+        return response
+
+
+def _percentile(hist, total, q):
+    """버킷 상한(ms). 마지막(inf) 버킷이면 None → JSON에 Infinity가 나가지 않게"""
+    threshold, seen = total * q, 0
+    for bound, n in zip(LATENCY_BUCKETS_MS, hist):
+        seen += n
+        if seen >= threshold:
+            break
+    return None if bound == float('inf') else bound
+
+
+def _bucket_label(bound):
+    return '+Inf' if bound == float('inf') else str(bound)
+
+
+def timing_snapshot() -> dict:
+    """모든 샤드 히스토그램 합산 (읽기 중 갱신되는 값은 근사치로 허용)"""
+    hists, samples = {}, {}
+    for shard_hists, shard_samples in _shards:
+        for name, hist in list(shard_hists.items()):
+            acc = hists.setdefault(name, [0] * len(LATENCY_BUCKETS_MS))
+            for i, n in enumerate(hist):
+                acc[i] += n
+        for name, sample in list(shard_samples.items()):
+            acc = samples.setdefault(name, [0] + [0.0] * len(BREAKDOWN))
+            for i, v in enumerate(sample):
+                acc[i] += v
+
+    result = {}
+    for name, hist in hists.items():
+        total = sum(hist)
+        sample = samples.get(name)
+        result[name] = {
+            'count': total,
+            'p50_ms': _percentile(hist, total, 0.50),
+            'p95_ms': _percentile(hist, total, 0.95),
+            'p99_ms': _percentile(hist, total, 0.99),
+            'buckets': {_bucket_label(b): n for b, n in zip(LATENCY_BUCKETS_MS, hist) if n},
+            'sampled': sample[0] if sample else 0,
+            'breakdown_avg_ms': (
+                {k: round(v / sample[0], 3) for k, v in zip(BREAKDOWN, sample[1:])} if sample else {}
+            ),
+        }
+    return result
+
+
+def timing_stats_view(request):
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    return JsonResponse({'views': timing_snapshot()})
@@ -0,0 +1,265 @@
+# 개발/테스트용 N+1 탐지기: view1/view2/view3 에서 손으로 찾던 N+1을 자동으로 찾고 고칠 코드를 제안
+#
+#   with NPlusOneDetector() as det:
+#       bad_category_view(request)
+#   det.findings()
+#   → [{'callsite': 'view3.py:4', 'model': 'Category', 'relation': 'products', 'count': 10,
+#       'suggestion': "Category.objects.prefetch_related('products')"}, ...]
+#
+# 원리
+# 1) QuerySet 결과 객체에 '어디서(호출 위치) 어떤 경로로 로드됐는지' 태그를 붙임
+#    - 일반 쿼리: 호출 위치 + 모델, 경로 ''
+#    - prefetch로 딸려온 객체 / 지연 로딩된 역참조 객체: 부모 태그 + 경로('products')
+# 2) 지연 로딩 지점(정방향 FK get_object, 역참조/M2M 매니저 접근)을 가로채서 태그별로 횟수 집계
+# 3) 같은 (호출 위치, 경로, 관계)가 threshold번 이상 → 루프 안 N+1 → select_related / Prefetch 제안
+# 운영 환경에서는 쓰지 말 것 (Django 내부 함수를 교체함)
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from typing import NamedTuple
+from django.db.models import query as query_mod
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor,
+    ReverseManyToOneDescriptor,
+)
+from .middleware import track_queries
+
+_DJANGO_DIR = os.sep + 'django' + os.sep
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class Origin(NamedTuple):
+    callsite: str  # 최초 쿼리셋을 평가한 코드 위치 (file:line)
+    model: str     # 최초 쿼리셋 모델
+    path: str      # 최초 모델에서 이 객체까지의 관계 경로 ('', 'products', ...)
+
+
+class _State(threading.local):
+    in_prefetch = 0
+
+_state = _State()
+_active = []      # 활성 탐지기 스택 (중첩 시 모두에 기록)
+_originals = {}   # 교체 전 원본 함수
+
+
+def _callsite() -> str:
+    f = sys._getframe(2)
+    while f:
+        name = f.f_code.co_filename
+        if _DJANGO_DIR not in name and os.path.abspath(name) != _THIS_FILE:
+            return f"{os.path.basename(name)}:{f.f_lineno}"
+        f = f.f_back
+    return '?'
+
+
+def _join(path, name):
+    return f"{path}__{name}" if path else name
+
+
+def _tag(objs, origin):
+    for obj in objs:
+        try:
+            obj._nplusone = origin
+        except AttributeError:
+            pass
+
+
+def _record(instance, relation, kind):
+    origin = getattr(instance, '_nplusone', None)
+    if not _active or origin is None or _state.in_prefetch:
+        return
+    key = (origin, type(instance).__name__, relation, kind)
+    for det in _active:
+        det.loads[key] += 1
+
+
+# ----- 교체 함수 -----
+
+def _tag_results(qs):
+    if not _active or _state.in_prefetch or qs._iterable_class is not query_mod.ModelIterable:
+        return
+    objs = qs._result_cache
+    if not objs or getattr(objs[0], '_nplusone', None) is not None:
+        return  # 이미 태그됨 (prefetch 직전에 붙인 경우)
+    via = getattr(qs, '_nplusone_via', None)  # 지연 로딩된 역참조 → 부모 경로를 이어받음
+    if via is not None:
+        _tag(objs, via)
+    elif len(objs) > 1:  # 1건짜리 쿼리는 N+1의 시작점이 될 수 없음
+        _tag(objs, Origin(_callsite(), qs.model.__name__, ''))
+
+
+def _fetch_all(self):
+    _originals['fetch_all'](self)
+    _tag_results(self)
+
+
+def _qs_prefetch_related_objects(self):
+    # 원본 _fetch_all 안에서 결과 생성 직후 호출됨 → prefetch 전에 부모 태그를 붙여야
+    # _prefetch_one_level 에서 자식(prefetch 된 객체)에게 경로를 물려줄 수 있음
+    _tag_results(self)
+    return _originals['qs_prefetch_related_objects'](self)
+
+
+def _forward_get_object(self, instance):
+    _record(instance, self.field.name, 'forward')
+    return _originals['forward_get_object'](self, instance)
+
+
+def _prefetch_cache_name(manager):
+    name = getattr(manager, 'prefetch_cache_name', None)  # M2M
+    if name:
+        return name
+    rel = manager.field.remote_field
+    return getattr(rel, 'cache_name', None) or rel.get_cache_name()
+
+
+def _reverse_get(self, instance, cls=None):
+    manager = _originals['reverse_get'](self, instance, cls)
+    if instance is None or not _active or _state.in_prefetch:
+        return manager
+    if _prefetch_cache_name(manager) in getattr(instance, '_prefetched_objects_cache', {}):
+        return manager  # prefetch 된 관계 → 쿼리 없음
+    origin = getattr(instance, '_nplusone', None)
+    if origin is None:
+        return manager
+
+    accessor = self.field.name if getattr(self, 'reverse', True) is False else self.rel.get_accessor_name()
+    _record(instance, accessor, 'reverse')
+    get_queryset = manager.get_queryset
+
+    def tagged_queryset():
+        qs = get_queryset()
+        qs._nplusone_via = origin._replace(path=_join(origin.path, accessor))
+        return qs
+
+    manager.get_queryset = tagged_queryset
+    return manager
+
+
+def _prefetch_related_objects(*args, **kwargs):
+    # prefetch 내부에서 일어나는 매니저 접근/쿼리는 N+1이 아님
+    _state.in_prefetch += 1
+    try:
+        return _originals['prefetch_related_objects'](*args, **kwargs)
+    finally:
+        _state.in_prefetch -= 1
+
+
+def _prefetch_one_level(instances, prefetcher, lookup, level):
+    result = _originals['prefetch_one_level'](instances, prefetcher, lookup, level)
+    parent = getattr(instances[0], '_nplusone', None) if instances else None
+    if parent is not None:
+        through = lookup.prefetch_through.split('__')[level]
+        _tag(result[0], parent._replace(path=_join(parent.path, through)))
+    return result
+
+
+def _install():
+    _originals.update(
+        fetch_all=query_mod.QuerySet._fetch_all,
+        qs_prefetch_related_objects=query_mod.QuerySet._prefetch_related_objects,
+        forward_get_object=ForwardManyToOneDescriptor.get_object,
+        reverse_get=ReverseManyToOneDescriptor.__get__,  # ManyToManyDescriptor도 상속
+        prefetch_related_objects=query_mod.prefetch_related_objects,
+        prefetch_one_level=query_mod.prefetch_one_level,
+    )
+    query_mod.QuerySet._fetch_all = _fetch_all
+    query_mod.QuerySet._prefetch_related_objects = _qs_prefetch_related_objects
+    ForwardManyToOneDescriptor.get_object = _forward_get_object
+    ReverseManyToOneDescriptor.__get__ = _reverse_get
+    query_mod.prefetch_related_objects = _prefetch_related_objects
+    query_mod.prefetch_one_level = _prefetch_one_level
+
+
+def _uninstall():
+    query_mod.QuerySet._fetch_all = _originals['fetch_all']
+    query_mod.QuerySet._prefetch_related_objects = _originals['qs_prefetch_related_objects']
+    ForwardManyToOneDescriptor.get_object = _originals['forward_get_object']
+    ReverseManyToOneDescriptor.__get__ = _originals['reverse_get']
+    query_mod.prefetch_related_objects = _originals['prefetch_related_objects']
+    query_mod.prefetch_one_level = _originals['prefetch_one_level']
+    _originals.clear()
+
+
+# ----- 제안 -----
+
+def suggest(origin: Origin, instance_model: str, relation: str, kind: str) -> str:
+    """
+    경로 ''      + 정방향  → select_related('seller')
+    경로 ''      + 역참조  → prefetch_related('comments')
+    경로 'products' + 정방향 → prefetch_related(Prefetch('products', queryset=Product.objects.select_related('seller')))
+    경로 'products' + 역참조 → prefetch_related('products__reviews')
+    """
+    base = f"{origin.model}.objects"
+    if not origin.path:
+        if kind == 'forward':
+            return f"{base}.select_related('{relation}')"
+        return f"{base}.prefetch_related('{relation}')"
+    if kind == 'forward':
+        return (f"{base}.prefetch_related(Prefetch('{origin.path}', "
+                f"queryset={instance_model}.objects.select_related('{relation}')))")
+    return f"{base}.prefetch_related('{_join(origin.path, relation)}')"
+
+
+class NPlusOneDetector:
+    """
+    with 블록 동안 N+1 지연 로딩 집계 (스레드 하나 기준)
+    중첩 가능: 바깥 탐지기(pytest 플러그인 등)도 안쪽 블록의 기록을 함께 받음.
+    교체 함수는 가장 바깥 탐지기가 설치/해제
+    """
+
+    def __init__(self, threshold=2):
+        self.threshold = threshold
+        self.loads = Counter()
+        self.queries = None
+
+    def __enter__(self):
+        if self in _active:
+            raise RuntimeError("이미 활성화된 NPlusOneDetector를 다시 열 수 없음")
+        if not _active:
+            _install()
+        _active.append(self)
+        self._tracker = track_queries()
+        self.queries = self._tracker.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._tracker.__exit__(*exc)
+        _active.remove(self)
+        if not _active:
+            _uninstall()
+        return False
+
+    def findings(self) -> list[dict]:
+        result = []
+        for (origin, instance_model, relation, kind), n in self.loads.most_common():
+            if n < self.threshold:
+                continue
+            result.append({
+                'callsite': origin.callsite,
+                'model': origin.model,
+                'path': origin.path,
+                'instance_model': instance_model,
+                'relation': relation,
+                'kind': kind,
+                'count': n,
+                'suggestion': suggest(origin, instance_model, relation, kind),
+            })
+        return result
+
+    def report(self) -> dict:
+        """JSON 직렬화 가능한 보고서: 지연 로딩 N+1 + 같은 모양 SQL 반복 (middleware.QueryStats)"""
+        return {
+            'findings': self.findings(),
+            'query_count': self.queries.count if self.queries else 0,
+            'duplicate_sql': [
+                {'sql': fp, 'count': n}
+                for fp, n in (self.queries.duplicates(self.threshold) if self.queries else [])
+            ],
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
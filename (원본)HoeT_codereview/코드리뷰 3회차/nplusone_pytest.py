@@ -0,0 +1,40 @@
+# N+1 탐지기 pytest 플러그인
+#   conftest.py:  pytest_plugins = ['app.nplusone_pytest']
+#   실행:          pytest --nplusone-report=nplusone.json [--nplusone-strict]
+# 테스트마다 NPlusOneDetector를 켜고, 발견 내역을 JSON 보고서로 모음
+# (테스트 안에서 탐지기를 또 열어도 됨 — 중첩 탐지기는 양쪽 모두에 기록)
+# --nplusone-strict: N+1이 발견된 테스트를 실패 처리 (CI에서 회귀 차단)
+import json
+import pytest
+from .nplusone import NPlusOneDetector
+
+_results = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('nplusone')
+    group.addoption('--nplusone-report', default=None, help='N+1 탐지 결과를 저장할 JSON 경로')
+    group.addoption('--nplusone-strict', action='store_true', help='N+1이 발견되면 테스트 실패')
+    group.addoption('--nplusone-threshold', type=int, default=2, help='같은 지연 로딩 반복 허용 횟수')
+
+
+@pytest.fixture(autouse=True)
+def _nplusone_detector(request):
+    with NPlusOneDetector(threshold=request.config.getoption('--nplusone-threshold', 2)) as det:
+        yield det
+
+    report = det.report()
+    if not report['findings']:
+        return
+    _results.append({'test': request.node.nodeid, **report})
+    if request.config.getoption('--nplusone-strict', False):
+        lines = [f"{f['callsite']} {f['model']}.{f['path'] or '-'} → {f['relation']} x{f['count']}\n"
+                 f"    fix: {f['suggestion']}" for f in report['findings']]
+        pytest.fail("N+1 detected:\n" + "\n".join(lines), pytrace=False)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    path = session.config.getoption('--nplusone-report', None)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'tests': _results}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,55 @@
+import pytest
+from django.db.models import Prefetch
+from .model3 import Category, Product, Seller
+from .nplusone import NPlusOneDetector
+from .nplusone_pytest import _nplusone_detector  # noqa: F401  플러그인 autouse fixture를 이 모듈에 적용
+
+pytestmark = pytest.mark.django_db
+
+def _make_catalog():
+    seller = Seller.objects.create(shop_name='shop')
+    for name in ('c1', 'c2'):
+        category = Category.objects.create(name=name)
+        Product.objects.create(name=f'{name}-a', category=category, seller=seller)
+        Product.objects.create(name=f'{name}-b', category=category, seller=seller)
+
+def test_prefetch_without_select_related_suggests_nested_prefetch():
+    _make_catalog()
+    with NPlusOneDetector() as det:
+        for category in Category.objects.prefetch_related('products'):
+            for product in category.products.all():
+                product.seller.shop_name  # 상품마다 판매자 쿼리 (view3 변형)
+
+    (finding,) = det.findings()
+    assert (finding['model'], finding['path'], finding['relation'], finding['count']) == ('Category', 'products', 'seller', 4)
+    assert finding['suggestion'] == (
+        "Category.objects.prefetch_related(Prefetch('products', "
+        "queryset=Product.objects.select_related('seller')))"
+    )
+
+def test_good_category_query_has_no_findings():
+    _make_catalog()
+    with NPlusOneDetector() as det:
+        categories = Category.objects.prefetch_related(
+            Prefetch('products', queryset=Product.objects.select_related('seller'))
+        )
+        for category in categories:
+            for product in category.products.all():
+                product.seller.shop_name
+
+    assert det.findings() == []
+
+def test_detector_nests_under_plugin_fixture(_nplusone_detector):
+    _make_catalog()
+    with NPlusOneDetector() as det:
+        for product in Product.objects.all():
+            product.seller.shop_name
+
+    assert [f['relation'] for f in det.findings()] == ['seller']
+    assert _nplusone_detector.findings() == det.findings()  # 바깥(플러그인) 탐지기도 같은 기록
+
+def test_reentering_same_detector_raises():
+    det = NPlusOneDetector()
+    with det:
+        with pytest.raises(RuntimeError):
+            det.__enter__()
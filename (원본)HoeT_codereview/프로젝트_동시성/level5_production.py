@@ -3,13 +3,16 @@
 
 import redis
 import uuid
-from django.db import transaction, OperationalError
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from contextlib import contextmanager
 import logging
+import random
+import threading
 import time
+from collections import Counter
 from celery import shared_task
 
 logger = logging.getLogger(__name__)
@@ -58,6 +61,87 @@ class CircuitBreaker:
 redis_circuit_breaker = CircuitBreaker()
 
 
+# PostgreSQL 데드락 / 직렬화 실패 → 트랜잭션을 처음부터 다시 하면 성공할 수 있는 에러
+RETRYABLE_PGCODES = {'40P01': 'deadlock', '40001': 'serialization'}
+
+
+def classify_db_error(exc):
+    """재시도 대상이면 에러 종류('deadlock'/'serialization'), 아니면 None"""
+    code = getattr(exc, 'pgcode', None) or getattr(exc.__cause__, 'pgcode', None)
+    if code:
+        return RETRYABLE_PGCODES.get(code)
+    msg = str(exc).lower()
+    if 'deadlock detected' in msg:
+        return 'deadlock'
+    if 'could not serialize access' in msg:
+        return 'serialization'
+    return None
+
+
+class RetryPolicy:
+    """
+    데드락 재시도 정책
+    - decorrelated jitter: sleep = min(cap, uniform(base, 직전 sleep * 3)) → 같은 박자로 재충돌 방지
+    - 재시도 예산(토큰 버킷): 성공마다 budget_ratio 적립, 재시도마다 1 소모 → 장애 시 재시도 폭주 차단
+    - 카운터: metrics() 로 조회
+    fn은 transaction.atomic 전체여야 함 (실패한 트랜잭션 안에서는 재시도 불가)
+    """
+    def __init__(self, max_attempts=3, base=0.1, cap=1.0, budget_ratio=0.2, max_tokens=20.0, name='default'):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.budget_ratio = budget_ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.name = name
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def _take_token(self):
+        with self._lock:
+            if self.tokens < 1:
+                self.counts['budget_denied'] += 1
+                return False
+            self.tokens -= 1
+            self.counts['retries'] += 1
+            return True
+
+    def _success(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.budget_ratio)
+            self.counts['success'] += 1
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def run(self, fn, *args, **kwargs):
+        sleep = self.base
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_db_error(e)
+                if kind is None:
+                    raise
+                self._count(kind)
+                if attempt == self.max_attempts:
+                    self._count('exhausted')
+                    raise
+                if not self._take_token():
+                    raise
+                sleep = min(self.cap, random.uniform(self.base, sleep * 3))
+                logger.warning(f"[{self.name}] {kind}, retrying... attempt={attempt}, sleep={sleep:.3f}s")
+                time.sleep(sleep)
+                continue
+            self._success()
+            return result
+
+
 @contextmanager
 def acquire_redis_lock(key, timeout=10):
     """Redis 분산 락 with Circuit Breaker"""
@@ -117,6 +201,43 @@ class BidMetrics:
             pass  # 메트릭 실패해도 메인 로직 영향 X
 
 
+def lock_in_order(*querysets):
+    """
+    여러 모델의 행을 전역 고정 순서(테이블 이름 → pk)로 잠금 → 호출부가 달라도 잠금 순서가 같아 데드락 없음
+    모델마다 SELECT ... ORDER BY pk FOR UPDATE 한 번. atomic 안에서 호출, 같은 모델은 queryset 하나로
+    반환: 인자 순서대로 잠긴 객체 리스트
+    """
+    tables = [qs.model._meta.db_table for qs in querysets]
+    if len(set(tables)) != len(tables):
+        raise ValueError('lock_in_order: 같은 모델은 queryset 하나로 합쳐서 넘길 것')
+    locked = [None] * len(querysets)
+    for i in sorted(range(len(querysets)), key=tables.__getitem__):
+        locked[i] = list(querysets[i].select_for_update().order_by('pk'))
+    return locked
+
+
+def _lock_currencies_and_auction(user_ids, auction_id):
+    """재화(여러 유저) + 경매를 lock_in_order로 잠금 → ({user_id: currency}, auction)"""
+    currencies, auctions = lock_in_order(
+        Currency.objects.filter(user_id__in=user_ids),
+        Auction.objects.filter(id=auction_id),
+    )
+    if not auctions:
+        raise Auction.DoesNotExist(f'Auction {auction_id} not found')
+    by_user = {c.user_id: c for c in currencies}
+    missing = set(user_ids) - by_user.keys()
+    if missing:
+        raise Currency.DoesNotExist(f'Currency not found: users={sorted(missing)}')
+    return by_user, auctions[0]
+
+
+DB_ONLY_LOCK_ATTEMPTS = 3  # DB-only 입찰: 확인~잠금 사이 최고 입찰자가 바뀐 경우 재시도 횟수
+
+# 데드락 재시도: decorrelated jitter + 프로세스 단위 재시도 예산
+# 카운터는 bid_retry_policy.metrics() 로 조회
+bid_retry_policy = RetryPolicy(max_attempts=3, base=0.1, cap=1.0, name='bid')
+
+
 class BidService:
     """프로덕션급 입찰 서비스"""
     
@@ -150,62 +271,14 @@ class BidService:
     
     @staticmethod
     def _execute_bid(user, auction_id, amount):
-        """Redis 락 + DB 트랜잭션"""
-        with transaction.atomic():
-            # 재시도 로직 (데드락 대비)
-            for attempt in range(3):
-                try:
-                    currency = Currency.objects.select_for_update(
-                        nowait=False
-                    ).get(user=user)
-                    
-                    if currency.available_balance < amount:
-                        raise ValueError('Insufficient balance')
-                    
-                    auction = Auction.objects.select_for_update(
-                        nowait=False
-                    ).get(id=auction_id)
-                    
-                    if auction.status != 'active':
-                        raise ValueError('Auction not active')
-                    
-                    if amount <= auction.current_price:
-                        raise ValueError(f'Bid must be higher than {auction.current_price}')
-                    
-                    previous_winner = auction.current_winner
-                    previous_amount = auction.current_price
-                    
-                    # 재화 잠금
-                    currency.balance -= amount
-                    currency.locked_balance += amount
-                    currency.save()
-                    
-                    # 입찰 생성
-                    bid = Bid.objects.create(
-                        auction=auction,
-                        user=user,
-                        amount=amount
-                    )
-                    
-                    # 경매 업데이트
-                    auction.current_price = amount
-                    auction.current_winner = user
-                    auction.save()
-                    
-                    # 성공 로그
-                    logger.info(
-                        f"Bid placed: user={user.id}, auction={auction_id}, "
-                        f"amount={amount}, attempt={attempt+1}"
-                    )
-                    
-                    break
-                    
-                except OperationalError as e:
-                    if 'deadlock' in str(e).lower() and attempt < 2:
-                        logger.warning(f"Deadlock detected, retrying... attempt={attempt+1}")
-                        time.sleep(0.1 * (attempt + 1))  # Exponential backoff
-                        continue
-                    raise
+        """Redis 락 + DB 트랜잭션 (데드락/직렬화 실패 시 트랜잭션 전체를 재시도)"""
+        bid, auction, previous_winner, previous_amount = bid_retry_policy.run(
+            BidService._bid_tx, user, auction_id, amount
+        )
+        
+        logger.info(
+            f"Bid placed: user={user.id}, auction={auction_id}, amount={amount}"
+        )
         
         # 이전 입찰자 처리 (비동기)
         if previous_winner:
@@ -220,55 +293,100 @@ class BidService:
             'current_price': auction.current_price
         }
     
+    @staticmethod
+    @transaction.atomic
+    def _bid_tx(user, auction_id, amount):
+        # 재화/경매를 전역 고정 순서로 잠금 (호출부마다 순서가 달라 생기던 데드락 방지)
+        currency, auction = _lock_currencies_and_auction([user.id], auction_id)
+        currency = currency[user.id]
+        
+        if currency.available_balance < amount:
+            raise ValueError('Insufficient balance')
+        
+        if auction.status != 'active':
+            raise ValueError('Auction not active')
+        
+        if amount <= auction.current_price:
+            raise ValueError(f'Bid must be higher than {auction.current_price}')
+        
+        previous_winner = auction.current_winner
+        previous_amount = auction.current_price
+        
+        # 재화 잠금
+        currency.balance -= amount
+        currency.locked_balance += amount
+        currency.save()
+        
+        # 입찰 생성
+        bid = Bid.objects.create(
+            auction=auction,
+            user=user,
+            amount=amount
+        )
+        
+        # 경매 업데이트
+        auction.current_price = amount
+        auction.current_winner = user
+        auction.save()
+        
+        return bid, auction, previous_winner, previous_amount
+    
     @staticmethod
     def _execute_bid_db_only(user, auction_id, amount):
         """Redis 없이 DB만 사용 (Fallback)"""
         logger.warning("Executing bid with DB-only lock")
         
-        # 더 긴 타임아웃
-        with transaction.atomic():
-            currency = Currency.objects.select_for_update(
-                nowait=False
-            ).get(user=user)
-            
-            if currency.available_balance < amount:
-                raise ValueError('Insufficient balance')
-            
-            auction = Auction.objects.select_for_update(
-                nowait=False
-            ).get(id=auction_id)
-            
-            if auction.status != 'active':
-                raise ValueError('Auction not active')
-            
-            if amount <= auction.current_price:
-                raise ValueError(f'Bid must be higher than {auction.current_price}')
-            
-            previous_winner = auction.current_winner
-            previous_amount = auction.current_price
-            
-            currency.balance -= amount
-            currency.locked_balance += amount
-            currency.save()
-            
-            bid = Bid.objects.create(
-                auction=auction,
-                user=user,
-                amount=amount
-            )
-            
-            auction.current_price = amount
-            auction.current_winner = user
-            auction.save()
-            
-            # 이전 입찰자 즉시 처리 (동기)
-            if previous_winner:
-                prev_currency = Currency.objects.select_for_update().get(
-                    user=previous_winner
+        # 이전 최고 입찰자 재화까지 같이 잠가야 함 → 잠금 없이 먼저 확인 후 한 번에 순서대로 잠금.
+        # 확인~잠금 사이에 최고 입찰자가 바뀌었으면 경매 행을 잡은 채 추가로 잠그지 않고
+        # 트랜잭션을 롤백한 뒤 처음부터 다시 (잠금 순서 유지)
+        for _ in range(DB_ONLY_LOCK_ATTEMPTS):
+            with transaction.atomic():
+                peek_winner_id = Auction.objects.filter(id=auction_id).values_list(
+                    'current_winner_id', flat=True
+                ).first()
+                currencies, auction = _lock_currencies_and_auction(
+                    {user.id, peek_winner_id} - {None}, auction_id
+                )
+                if auction.current_winner_id is not None and auction.current_winner_id not in currencies:
+                    continue  # atomic 종료(커밋할 변경 없음) → 잠금 해제 후 재시도
+                
+                currency = currencies[user.id]
+                
+                if currency.available_balance < amount:
+                    raise ValueError('Insufficient balance')
+                
+                if auction.status != 'active':
+                    raise ValueError('Auction not active')
+                
+                if amount <= auction.current_price:
+                    raise ValueError(f'Bid must be higher than {auction.current_price}')
+                
+                previous_winner_id = auction.current_winner_id
+                previous_amount = auction.current_price
+                
+                currency.balance -= amount
+                currency.locked_balance += amount
+                currency.save()
+                
+                bid = Bid.objects.create(
+                    auction=auction,
+                    user=user,
+                    amount=amount
                 )
-                prev_currency.balance += previous_amount
-                prev_currency.locked_balance -= previous_amount
-                prev_currency.save()
+                
+                auction.current_price = amount
+                auction.current_winner = user
+                auction.save()
+                
+                # 이전 입찰자 즉시 처리 (동기)
+                if previous_winner_id:
+                    prev_currency = currencies[previous_winner_id]
+                    prev_currency.balance += previous_amount
+                    prev_currency.locked_balance -= previous_amount
+                    prev_currency.save()
+            break
+        else:
+            raise ValueError('Auction is busy, please retry')
         
         return {
             'success': True,
@@ -291,7 +409,7 @@ def release_previous_bid(self, user_id, auction_id, amount):
             User = get_user_model()
             
             user = User.objects.get(id=user_id)
-            currency = Currency.objects.select_for_update().get(user=user)
+            (currency,) = lock_in_order(Currency.objects.filter(user=user))[0]
             
             currency.balance += amount
             currency.locked_balance -= amount
@@ -377,8 +495,9 @@ Level 5 특징:
    ✓ 클라이언트에 상태 알림
 
 3. 재시도 로직:
-   ✓ 데드락 자동 재시도
-   ✓ Exponential backoff
+   ✓ 데드락 자동 재시도 (트랜잭션 단위)
+   ✓ Decorrelated jitter backoff
+   ✓ 재시도 예산 (토큰 버킷)으로 폭주 방지
    ✓ 최대 3회 시도
 
 4. 비동기 처리:
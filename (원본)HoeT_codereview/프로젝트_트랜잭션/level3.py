@@ -1,6 +1,8 @@
 
 # models.py
+import uuid
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -9,21 +11,42 @@ class UserCurrency(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     total_amount = models.IntegerField(default=0)  # 전체 재화
     locked_amount = models.IntegerField(default=0)  # 잠긴 재화
+    # 사용 가능한 재화 (DB가 계산해서 저장하는 generated column)
+    # → 조건부 UPDATE / "잔액 충분한 유저" 조회를 DB 안에서 처리
+    # 주의: save() 후 메모리 값은 갱신되지 않음 (필요하면 refresh_from_db)
+    available_amount = models.GeneratedField(
+        expression=F('total_amount') - F('locked_amount'),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
     
-    @property
-    def available_amount(self):
-        """사용 가능한 재화"""
-        return self.total_amount - self.locked_amount
+    class Meta:
+        constraints = [
+            # available_amount >= 0 을 원본 컬럼 기준으로 강제 → 초과 잠금/차감은 DB가 거부
+            models.CheckConstraint(
+                check=Q(locked_amount__gte=0) & Q(total_amount__gte=F('locked_amount')),
+                name='usercurrency_available_amount_non_negative',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['available_amount']),
+        ]
     
     def __str__(self):
         return f"{self.user.username}: {self.total_amount} (locked: {self.locked_amount})"
 
 
+def _new_lock_id():
+    return str(uuid.uuid4())
+
+
 class CurrencyLock(models.Model):
     """재화 잠금 기록"""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     auction = models.ForeignKey('Auction', on_delete=models.CASCADE)
     amount = models.IntegerField()
+    # Redis 해시(currency_lock:{user}:{auction})의 lock_id와 대조하는 키
+    lock_id = models.CharField(max_length=36, unique=True, default=_new_lock_id)
     locked_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(
         max_length=20,
@@ -31,6 +54,7 @@ class CurrencyLock(models.Model):
             ('locked', 'Locked'),
             ('released', 'Released'),
             ('consumed', 'Consumed'),
+            ('expired', 'Expired'),
         ],
         default='locked'
     )
@@ -38,6 +62,69 @@ class CurrencyLock(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['user', 'auction', 'status']),
+            # 상태별 id 순 청크 스캔 (만료 정리 / Redis 정합성 검사)
+            models.Index(fields=['status', 'id']),
+        ]
+
+
+class CurrencyJournalEntry(models.Model):
+    """
+    재화 변동 감사 원장 (append-only)
+
+    UserCurrency 변경과 같은 트랜잭션에서 INSERT만 → UserCurrency의 모든 변화를 나중에 재구성/검증.
+    잔액의 원본은 여전히 UserCurrency (원장이 행 잠금 경합을 줄여 주지는 않음)
+    """
+    KIND_CHOICES = [
+        ('deposit', 'Deposit'),
+        ('lock', 'Lock'),
+        ('release', 'Release'),
+        ('consume', 'Consume'),
+        ('expire', 'Expire'),
+        ('adjust', 'Adjust'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.PROTECT)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    total_delta = models.IntegerField(default=0)   # total_amount 변화량
+    locked_delta = models.IntegerField(default=0)  # locked_amount 변화량
+    auction_id = models.IntegerField(null=True, blank=True)
+    lock_id = models.CharField(max_length=36, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # 스냅샷 이후 델타 합산: WHERE user_id = ? AND id > ?
+            models.Index(fields=['user', 'id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("CurrencyJournalEntry is append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("CurrencyJournalEntry is append-only")
+
+
+class CurrencyBalanceSnapshot(models.Model):
+    """원장 기준 잔액 스냅샷 (last_entry_id까지 반영된 값)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    total_amount = models.IntegerField()
+    locked_amount = models.IntegerField()
+    last_entry_id = models.BigIntegerField()
+    taken_at = models.DateTimeField(auto_now_add=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'last_entry_id'],
+                name='currencysnapshot_user_entry_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_entry_id']),
         ]
 
 
@@ -78,6 +165,7 @@ from django.db import transaction
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from .models import Auction, Bid, UserCurrency, CurrencyLock
+from .services.currency_service import CurrencyLedger, CurrencyLockService
 
 @api_view(['POST'])
 def place_bid_v3(request, auction_id):
@@ -130,6 +218,11 @@ def place_bid_v3(request, auction_id):
                     lock.status = 'released'
                     lock.save()
                     
+                    CurrencyLedger.append(
+                        lock.user_id, 'release', locked_delta=-lock.amount,
+                        auction_id=auction.id, lock_id=lock.lock_id
+                    )
+                    
                     # 이전 입찰 상태 업데이트
                     Bid.objects.filter(
                         user=lock.user,
@@ -148,6 +241,10 @@ def place_bid_v3(request, auction_id):
                 amount=bid_amount,
                 status='locked'
             )
+            CurrencyLedger.append(
+                user.id, 'lock', locked_delta=bid_amount,
+                auction_id=auction.id, lock_id=currency_lock.lock_id
+            )
             
             # 8. 입찰 생성
             bid = Bid.objects.create(
@@ -167,7 +264,8 @@ def place_bid_v3(request, auction_id):
                 'success': True,
                 'bid_id': bid.id,
                 'locked_amount': user_currency.locked_amount,
-                'available_amount': user_currency.available_amount
+                # generated column은 save() 후 갱신되지 않으므로 직접 계산
+                'available_amount': user_currency.total_amount - user_currency.locked_amount
             })
             
     except UserCurrency.DoesNotExist:
@@ -200,44 +298,25 @@ def finalize_auction(request, auction_id):
                     'error': 'Auction already finalized'
                 }, status=400)
             
-            # 낙찰자 재화 차감
-            if auction.current_winner:
-                winner_currency = UserCurrency.objects.select_for_update().get(
-                    user=auction.current_winner
-                )
-                
-                # 잠금된 재화를 실제로 차감
-                winner_lock = CurrencyLock.objects.get(
-                    user=auction.current_winner,
+            # 낙찰 잠금 확정 + 나머지 잠금 일괄 해제
+            # → 입찰자 수와 무관하게 set-based 쿼리 몇 개로 정산 (유저별 select_for_update 루프 없음)
+            if auction.current_winner_id:
+                winner_lock_id = CurrencyLock.objects.filter(
+                    user_id=auction.current_winner_id,
                     auction=auction,
                     status='locked'
-                )
+                ).order_by('-locked_at').values_list('lock_id', flat=True).first()
                 
-                winner_currency.total_amount -= winner_lock.amount
-                winner_currency.locked_amount -= winner_lock.amount
-                winner_currency.save()
+                if winner_lock_id is None:
+                    raise CurrencyLock.DoesNotExist('Winner lock not found')
                 
-                winner_lock.status = 'consumed'
-                winner_lock.save()
+                CurrencyLockService.consume_many(auction.id, [winner_lock_id])
             
             # 다른 입찰자들의 잠금 해제 (이미 해제됐어야 하지만 안전장치)
-            remaining_locks = CurrencyLock.objects.filter(
-                auction=auction,
-                status='locked'
-            ).exclude(user=auction.current_winner)
-            
-            for lock in remaining_locks:
-                user_currency = UserCurrency.objects.select_for_update().get(
-                    user=lock.user
-                )
-                user_currency.locked_amount -= lock.amount
-                user_currency.save()
-                
-                lock.status = 'released'
-                lock.save()
+            CurrencyLockService.release_many(auction.id)
             
             auction.status = 'ended'
-            auction.save()
+            auction.save(update_fields=['status'])
             
             return Response({
                 'success': True,
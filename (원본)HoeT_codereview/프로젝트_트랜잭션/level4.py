@@ -65,7 +65,7 @@ class CurrencyLockService:
             
             try:
                 # 2. DB에서 재화 확인
-                from .models import UserCurrency
+                from .models import UserCurrency, CurrencyJournalEntry
                 
                 user_currency = UserCurrency.objects.get(user_id=user_id)
                 
@@ -94,6 +94,12 @@ class CurrencyLockService:
                     )
                     user_currency.locked_amount += amount
                     user_currency.save()
+                    
+                    # 재화 변동은 같은 트랜잭션에서 원장에 기록
+                    CurrencyJournalEntry.objects.create(
+                        user_id=user_id, kind='lock', locked_delta=amount,
+                        auction_id=auction_id, lock_id=lock_id
+                    )
                 
                 logger.info(f"Currency locked: user={user_id}, amount={amount}")
                 
@@ -149,7 +155,7 @@ class CurrencyLockService:
             
             # 2. DB에서 잠금 감소
             with transaction.atomic():
-                from .models import UserCurrency, CurrencyLock
+                from .models import UserCurrency, CurrencyLock, CurrencyJournalEntry
                 
                 user_currency = UserCurrency.objects.select_for_update().get(
                     user_id=user_id
@@ -159,6 +165,11 @@ class CurrencyLockService:
                 if user_currency.locked_amount >= amount:
                     user_currency.locked_amount -= amount
                     user_currency.save()
+                    
+                    CurrencyJournalEntry.objects.create(
+                        user_id=user_id, kind='release', locked_delta=-amount,
+                        auction_id=auction_id, lock_id=lock_id
+                    )
                 else:
                     logger.error(
                         f"Locked amount mismatch: user={user_id}, "
@@ -205,7 +216,7 @@ class CurrencyLockService:
             
             # DB에서 실제 차감
             with transaction.atomic():
-                from .models import UserCurrency, CurrencyLock
+                from .models import UserCurrency, CurrencyLock, CurrencyJournalEntry
                 
                 user_currency = UserCurrency.objects.select_for_update().get(
                     user_id=user_id
@@ -216,6 +227,12 @@ class CurrencyLockService:
                 user_currency.locked_amount -= amount
                 user_currency.save()
                 
+                CurrencyJournalEntry.objects.create(
+                    user_id=user_id, kind='consume',
+                    total_delta=-amount, locked_delta=-amount,
+                    auction_id=auction_id, lock_id=lock_id
+                )
+                
                 # CurrencyLock 기록 업데이트
                 CurrencyLock.objects.filter(
                     user_id=user_id,
@@ -2,11 +2,14 @@
 # services/currency_service.py
 import redis
 import uuid
-from django.db import transaction
+from django.db import transaction, IntegrityError
+from django.db.models import F, Case, When, Value, IntegerField, Max, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import timedelta
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from collections import defaultdict
 from contextlib import contextmanager
 import time
 
@@ -59,6 +62,21 @@ class CircuitBreaker:
 redis_circuit_breaker = CircuitBreaker()
 
 
+class RateLimiter:
+    """초당 작업 수 예산 (배치 작업이 운영 트래픽을 잡아먹지 않도록 페이싱)"""
+    def __init__(self, ops_per_sec: int):
+        self.interval = 1.0 / ops_per_sec if ops_per_sec else 0
+        self.next_at = time.monotonic()
+    
+    def wait(self, ops: int = 1):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + ops * self.interval
+
+
 class CurrencyLockMetrics:
     """재화 잠금 메트릭 수집"""
     
@@ -94,12 +112,131 @@ class CurrencyLockMetrics:
         }
 
 
+class CurrencyLedger:
+    """
+    재화 감사 원장 (append-only journal + 주기적 스냅샷)
+
+    잔액의 원본은 UserCurrency. 원장은 성능 경로가 아니라 감사 로그:
+    - 쓰기: UserCurrency를 바꾸는 모든 경로가 같은 트랜잭션에서 INSERT 1건 추가
+      (사용자 행 UPDATE는 그대로 → 경합을 줄이지 않고 쓰기 비용이 약간 늘어남)
+    - 읽기: API 잔액 조회는 UserCurrency. balance()는 감사/정합성 검사
+      (reconcile_currency_balances)에서만 사용
+    """
+
+    # 아직 커밋 안 된 트랜잭션의 낮은 id가 스냅샷 경계를 건너뛰지 않도록 여유를 둠
+    SNAPSHOT_LAG_SECONDS = 60
+    RECONCILE_BATCH_SIZE = 500
+
+    @staticmethod
+    def append(
+        user_id: int,
+        kind: str,
+        total_delta: int = 0,
+        locked_delta: int = 0,
+        auction_id: Optional[int] = None,
+        lock_id: str = ''
+    ) -> None:
+        """원장 기록 1건 (호출한 쪽 트랜잭션에 포함됨)"""
+        from .models import CurrencyJournalEntry
+
+        CurrencyJournalEntry.objects.create(
+            user_id=user_id,
+            kind=kind,
+            total_delta=total_delta,
+            locked_delta=locked_delta,
+            auction_id=auction_id,
+            lock_id=lock_id or ''
+        )
+
+    @staticmethod
+    def deposit(user_id: int, amount: int, kind: str = 'deposit') -> None:
+        """재화 충전: UserCurrency 증가 + 원장 기록을 한 트랜잭션으로"""
+        from .models import UserCurrency
+
+        if amount <= 0:
+            raise ValueError(f"Deposit amount must be positive: {amount}")
+
+        with transaction.atomic():
+            updated = UserCurrency.objects.filter(user_id=user_id).update(
+                total_amount=F('total_amount') + amount
+            )
+            if not updated:
+                UserCurrency.objects.create(user_id=user_id, total_amount=amount)
+
+            CurrencyLedger.append(user_id, kind, total_delta=amount)
+
+    @staticmethod
+    def append_many(entries: List[Dict[str, Any]]) -> None:
+        """원장 기록 일괄 INSERT"""
+        from .models import CurrencyJournalEntry
+
+        if entries:
+            CurrencyJournalEntry.objects.bulk_create(
+                [CurrencyJournalEntry(**entry) for entry in entries],
+                batch_size=CurrencyLockService.SETTLE_CHUNK_SIZE
+            )
+
+    @staticmethod
+    def balance(user_id: int) -> Dict[str, int]:
+        """원장 기준 잔액: 최신 스냅샷 + 이후 델타 (쿼리 2회, 감사/검증용)"""
+        from .models import CurrencyJournalEntry, CurrencyBalanceSnapshot
+
+        snapshot = CurrencyBalanceSnapshot.objects.filter(
+            user_id=user_id
+        ).order_by('-last_entry_id').first()
+
+        base_total = snapshot.total_amount if snapshot else 0
+        base_locked = snapshot.locked_amount if snapshot else 0
+        last_entry_id = snapshot.last_entry_id if snapshot else 0
+
+        delta = CurrencyJournalEntry.objects.filter(
+            user_id=user_id,
+            id__gt=last_entry_id
+        ).aggregate(
+            total=Coalesce(Sum('total_delta'), 0),
+            locked=Coalesce(Sum('locked_delta'), 0)
+        )
+
+        total = base_total + delta['total']
+        locked = base_locked + delta['locked']
+        return {
+            'total_amount': total,
+            'locked_amount': locked,
+            'available_amount': total - locked
+        }
+
+    @staticmethod
+    def open_balances() -> int:
+        """
+        원장 도입 시 1회 실행: 원장 기록이 없는 사용자의 현재 UserCurrency를
+        'adjust' 기록으로 옮겨 시작 잔액을 맞춤
+        """
+        from .models import CurrencyJournalEntry, UserCurrency
+
+        rows = UserCurrency.objects.exclude(
+            user_id__in=CurrencyJournalEntry.objects.values('user_id')
+        ).values_list('user_id', 'total_amount', 'locked_amount')
+
+        entries = [
+            {
+                'user_id': user_id,
+                'kind': 'adjust',
+                'total_delta': total,
+                'locked_delta': locked,
+            }
+            for user_id, total, locked in rows.iterator()
+        ]
+        CurrencyLedger.append_many(entries)
+        return len(entries)
+
+
 class CurrencyLockService:
  
     
     LOCK_TIMEOUT = 300  # 5분
     RETRY_ATTEMPTS = 3
     RETRY_DELAY = 0.1  # 100ms
+    SETTLE_CHUNK_SIZE = 500  # 일괄 정산 시 쿼리 1회당 최대 행 수
     
     @staticmethod
     def _get_lock_key(user_id: int, auction_id: int) -> str:
@@ -261,6 +398,10 @@ class CurrencyLockService:
                             status='locked',
                             lock_id=lock_id
                         )
+                        CurrencyLedger.append(
+                            user_id, 'lock', locked_delta=amount,
+                            auction_id=auction_id, lock_id=lock_id
+                        )
                 
                 except Exception as e:
                     logger.error(f"DB lock creation failed: {e}", exc_info=True)
@@ -305,7 +446,101 @@ class CurrencyLockService:
                 'error': str(e),
                 'available_amount': None
             }
-    
+
+    @staticmethod
+    def acquire_currency_lock_fast(
+        user_id: int,
+        auction_id: int,
+        amount: int
+    ) -> Dict[str, Any]:
+        """
+        재화 잠금 획득 (fast path, Redis 미사용)
+
+        가용 재화 확인 + locked_amount 증가를 조건부 UPDATE 한 번으로 처리하고
+        같은 트랜잭션에서 CurrencyLock을 INSERT 한다.
+
+        UPDATE user_currency
+           SET locked_amount = locked_amount + %(amount)s
+         WHERE user_id = %(user_id)s
+           AND available_amount >= %(amount)s
+
+        - 잠금 상태의 원본은 CurrencyLock 행 하나뿐 → Redis 이중 기록/보상 삭제 불필요
+        - release/consume은 Redis 해시가 없어도 DB 기준으로 동작하므로 그대로 호환
+        - Redis 메트릭(CurrencyLockMetrics)도 호출하지 않음 → 로그로만 기록
+
+        Returns: acquire_currency_lock과 동일한 형태
+        """
+        start_time = time.time()
+        lock_id = str(uuid.uuid4())
+
+        from .models import UserCurrency, CurrencyLock
+
+        try:
+            with transaction.atomic():
+                # 1. 조건부 UPDATE (행 잠금은 UPDATE 순간에만, 재확인 불필요)
+                updated = UserCurrency.objects.filter(
+                    user_id=user_id,
+                    available_amount__gte=amount
+                ).update(locked_amount=F('locked_amount') + amount)
+
+                if updated:
+                    # 2. 같은 트랜잭션에서 잠금 기록 생성
+                    CurrencyLock.objects.create(
+                        user_id=user_id,
+                        auction_id=auction_id,
+                        amount=amount,
+                        status='locked',
+                        lock_id=lock_id
+                    )
+                    CurrencyLedger.append(
+                        user_id, 'lock', locked_delta=amount,
+                        auction_id=auction_id, lock_id=lock_id
+                    )
+
+        except Exception as e:
+            logger.error(f"Currency lock (fast path) error: {e}", exc_info=True)
+            return {
+                'success': False,
+                'lock_id': None,
+                'error': str(e),
+                'available_amount': None
+            }
+
+        if not updated:
+            # 실패 경로에서만 원인 구분용 조회 (행 없음 vs 잔액 부족)
+            row = UserCurrency.objects.filter(user_id=user_id).values_list(
+                'total_amount', 'locked_amount'
+            ).first()
+
+            if row is None:
+                return {
+                    'success': False,
+                    'lock_id': None,
+                    'error': 'User currency not found',
+                    'available_amount': None
+                }
+
+            return {
+                'success': False,
+                'lock_id': None,
+                'error': 'Insufficient currency',
+                'available_amount': row[0] - row[1]
+            }
+
+        duration_ms = (time.time() - start_time) * 1000
+
+        logger.info(
+            f"Currency locked (fast path): user={user_id}, auction={auction_id}, "
+            f"amount={amount}, lock_id={lock_id}, duration={duration_ms:.2f}ms"
+        )
+
+        return {
+            'success': True,
+            'lock_id': lock_id,
+            'error': None,
+            'available_amount': None  # 성공 시 추가 조회를 하지 않음
+        }
+
     @staticmethod
     def release_currency_lock(
         user_id: int,
@@ -321,68 +556,53 @@ class CurrencyLockService:
         try:
             lock_key = CurrencyLockService._get_lock_key(user_id, auction_id)
             
-            # 1. Redis에서 잠금 정보 조회
-            try:
-                lock_data = redis_circuit_breaker.call(
-                    redis_client.hgetall,
-                    lock_key
-                )
-            except Exception as e:
-                logger.error(f"Redis fetch failed during unlock: {e}")
-                lock_data = {}
+            from .models import CurrencyLock, UserCurrency
             
-            # 2. DB에서 잠금 정보 조회 (Redis 실패 시 대비)
-            from .models import CurrencyLock
+            # 1. DB 잠금 행 조회 (금액 확인용, 잠금 기록은 locked_amount 증가와 같은 트랜잭션에서 생성됨)
+            db_lock = CurrencyLock.objects.filter(
+                user_id=user_id,
+                auction_id=auction_id,
+                lock_id=lock_id
+            ).only('amount').first()
             
-            try:
-                db_lock = CurrencyLock.objects.get(
-                    user_id=user_id,
-                    auction_id=auction_id,
-                    lock_id=lock_id
-                )
-                amount = db_lock.amount
-                
-                if db_lock.status != 'locked':
-                    logger.info(f"Lock already released: {lock_id}")
-                    return True
-                
-            except CurrencyLock.DoesNotExist:
+            if db_lock is None:
+                # DB에 없으면 locked_amount도 증가한 적 없음 → Redis 흔적만 정리
                 logger.warning(f"Lock not found in DB: {lock_id}")
-                
-                # Redis에 정보가 있으면 사용
-                if lock_data:
-                    amount = int(lock_data['amount'])
-                else:
-                    return True  # 이미 처리됨
+                try:
+                    redis_client.delete(lock_key)
+                except Exception as e:
+                    logger.error(f"Redis cleanup failed: {e}")
+                return True
             
-            # 3. DB 잠금 해제
+            amount = db_lock.amount
+            
+            # 2. 상태 전이를 조건부 UPDATE로 먼저 → 만료/확정/다른 해제와 경합해도 한 번만 차감
             with transaction.atomic():
-                from .models import UserCurrency
+                updated = CurrencyLock.objects.filter(
+                    pk=db_lock.pk,
+                    status='locked'
+                ).update(status='released')
                 
-                user_currency = UserCurrency.objects.select_for_update().get(
-                    user_id=user_id
-                )
+                if not updated:
+                    logger.info(f"Lock already released: {lock_id}")
+                    return True
                 
-                # 안전 장치
-                if user_currency.locked_amount >= amount:
-                    user_currency.locked_amount -= amount
-                    user_currency.save()
-                else:
+                # 3. locked_amount >= 0 은 CHECK 제약조건이 보장
+                # → 불일치 시 0으로 덮어쓰지 않고 IntegrityError로 상태 전이까지 롤백
+                try:
+                    UserCurrency.objects.filter(user_id=user_id).update(
+                        locked_amount=F('locked_amount') - amount
+                    )
+                except IntegrityError:
                     logger.error(
-                        f"Locked amount mismatch: user={user_id}, "
-                        f"locked={user_currency.locked_amount}, release={amount}"
+                        f"Locked amount mismatch: user={user_id}, release={amount}"
                     )
-                    # 어쨌든 0으로 맞춤
-                    user_currency.locked_amount = max(0, user_currency.locked_amount - amount)
-                    user_currency.save()
+                    raise
                 
-                # CurrencyLock 상태 업데이트
-                CurrencyLock.objects.filter(
-                    user_id=user_id,
-                    auction_id=auction_id,
-                    lock_id=lock_id,
-                    status='locked'
-                ).update(status='released')
+                CurrencyLedger.append(
+                    user_id, 'release', locked_delta=-amount,
+                    auction_id=auction_id, lock_id=lock_id
+                )
             
             # 4. Redis 정리
             try:
@@ -419,45 +639,52 @@ class CurrencyLockService:
             from .models import UserCurrency, CurrencyLock
             
             # DB에서 잠금 정보 조회
-            try:
-                db_lock = CurrencyLock.objects.get(
-                    user_id=user_id,
-                    auction_id=auction_id,
-                    lock_id=lock_id
-                )
-            except CurrencyLock.DoesNotExist:
+            db_lock = CurrencyLock.objects.filter(
+                user_id=user_id,
+                auction_id=auction_id,
+                lock_id=lock_id
+            ).only('amount', 'status').first()
+            
+            if db_lock is None:
                 logger.error(f"Lock not found for consumption: {lock_id}")
                 return False
             
-            if db_lock.status == 'consumed':
-                logger.info(f"Lock already consumed: {lock_id}")
-                return True
-            
             amount = db_lock.amount
             
-            # DB 트랜잭션
+            # DB 트랜잭션: locked → consumed 전이에 성공한 경우에만 차감
             with transaction.atomic():
-                user_currency = UserCurrency.objects.select_for_update().get(
-                    user_id=user_id
-                )
+                updated = CurrencyLock.objects.filter(
+                    pk=db_lock.pk,
+                    status='locked'
+                ).update(status='consumed')
                 
-                # 재화 차감
-                user_currency.total_amount -= amount
-                user_currency.locked_amount -= amount
+                if not updated:
+                    status = CurrencyLock.objects.filter(pk=db_lock.pk).values_list(
+                        'status', flat=True
+                    ).first()
+                    if status == 'consumed':
+                        logger.info(f"Lock already consumed: {lock_id}")
+                        return True
+                    # 해제/만료된 잠금은 확정 불가 (재화가 이미 풀림)
+                    logger.error(f"Lock not consumable: {lock_id}, status={status}")
+                    return False
                 
-                # 음수 방지
-                if user_currency.total_amount < 0:
+                # 재화 차감 (음수 방지는 CHECK 제약조건이 담당, 위반 시 상태 전이까지 롤백)
+                try:
+                    UserCurrency.objects.filter(user_id=user_id).update(
+                        total_amount=F('total_amount') - amount,
+                        locked_amount=F('locked_amount') - amount
+                    )
+                except IntegrityError:
                     logger.error(
-                        f"Currency would go negative: user={user_id}, "
-                        f"total={user_currency.total_amount}, consume={amount}"
+                        f"Currency would go negative: user={user_id}, consume={amount}"
                     )
                     raise Exception("Insufficient total currency")
                 
-                user_currency.save()
-                
-                # 상태 업데이트
-                db_lock.status = 'consumed'
-                db_lock.save()
+                CurrencyLedger.append(
+                    user_id, 'consume', total_delta=-amount, locked_delta=-amount,
+                    auction_id=auction_id, lock_id=lock_id
+                )
             
             # Redis 정리
             lock_key = CurrencyLockService._get_lock_key(user_id, auction_id)
@@ -475,6 +702,127 @@ class CurrencyLockService:
             logger.error(f"Currency consume error: {e}", exc_info=True)
             return False
 
+    @staticmethod
+    def _delete_lock_keys(keys) -> None:
+        """Redis 잠금 키 일괄 삭제 (파이프라인 1회 왕복)"""
+        if not keys:
+            return
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            keys = list(keys)
+            for i in range(0, len(keys), CurrencyLockService.SETTLE_CHUNK_SIZE):
+                pipe.delete(*keys[i:i + CurrencyLockService.SETTLE_CHUNK_SIZE])
+            redis_circuit_breaker.call(pipe.execute)
+        except Exception as e:
+            logger.error(f"Redis bulk cleanup failed: {e}")
+
+    @staticmethod
+    def _settle_many(
+        auction_id: int,
+        lock_ids: Optional[List[str]],
+        new_status: str
+    ) -> Dict[str, int]:
+        """
+        경매 단위 잠금 일괄 정산 (release_many / consume_many 공통)
+
+        잠금 수와 무관하게 청크당 3개의 set-based 쿼리로 처리:
+        1. SELECT ... FOR UPDATE  (대상 잠금 조회, user_id 순)
+        2. UPDATE user_currency SET locked_amount = locked_amount - CASE user_id WHEN ... END
+        3. UPDATE currency_lock SET status = ... WHERE id IN (...)
+        """
+        from .models import UserCurrency, CurrencyLock
+
+        with transaction.atomic():
+            qs = CurrencyLock.objects.select_for_update().filter(
+                auction_id=auction_id,
+                status='locked'
+            )
+            if lock_ids is not None:
+                qs = qs.filter(lock_id__in=lock_ids)
+
+            locks = list(
+                qs.order_by('user_id', 'id').values_list('id', 'user_id', 'amount', 'lock_id')
+            )
+
+            # 사용자별 합산
+            per_user = defaultdict(int)
+            for _, user_id, amount, _ in locks:
+                per_user[user_id] += amount
+
+            user_ids = list(per_user)
+            for i in range(0, len(user_ids), CurrencyLockService.SETTLE_CHUNK_SIZE):
+                chunk = user_ids[i:i + CurrencyLockService.SETTLE_CHUNK_SIZE]
+                delta = Case(
+                    *[When(user_id=uid, then=Value(per_user[uid])) for uid in chunk],
+                    output_field=IntegerField()
+                )
+                updates = {'locked_amount': F('locked_amount') - delta}
+                if new_status == 'consumed':
+                    updates['total_amount'] = F('total_amount') - delta
+                # 음수 방지는 CHECK 제약조건이 담당 (위반 시 전체 롤백)
+                UserCurrency.objects.filter(user_id__in=chunk).update(**updates)
+
+            ids = [lock_pk for lock_pk, _, _, _ in locks]
+            for i in range(0, len(ids), CurrencyLockService.SETTLE_CHUNK_SIZE):
+                CurrencyLock.objects.filter(
+                    id__in=ids[i:i + CurrencyLockService.SETTLE_CHUNK_SIZE]
+                ).update(status=new_status)
+
+            # 원장은 잠금 단위로 기록 (bulk INSERT)
+            kind = 'consume' if new_status == 'consumed' else 'release'
+            CurrencyLedger.append_many([
+                {
+                    'user_id': user_id,
+                    'kind': kind,
+                    'total_delta': -amount if kind == 'consume' else 0,
+                    'locked_delta': -amount,
+                    'auction_id': auction_id,
+                    'lock_id': lock_id,
+                }
+                for _, user_id, amount, lock_id in locks
+            ])
+
+            settled = {
+                'locks': len(locks),
+                'users': len(per_user),
+                'amount': sum(per_user.values())
+            }
+            lock_keys = {
+                CurrencyLockService._get_lock_key(uid, auction_id) for uid in per_user
+            }
+
+            # 바깥 트랜잭션까지 커밋된 뒤에 Redis 정리
+            transaction.on_commit(
+                lambda: CurrencyLockService._delete_lock_keys(lock_keys)
+            )
+
+        logger.info(
+            f"Currency locks {new_status} in bulk: auction={auction_id}, "
+            f"locks={settled['locks']}, users={settled['users']}, amount={settled['amount']}"
+        )
+        return settled
+
+    @staticmethod
+    def release_many(
+        auction_id: int,
+        lock_ids: Optional[List[str]] = None
+    ) -> Dict[str, int]:
+        """
+        재화 잠금 일괄 해제
+
+        lock_ids를 생략하면 해당 경매의 locked 상태 잠금 전체를 해제한다.
+        이미 해제/확정된 잠금은 대상에서 빠지므로 재호출해도 안전 (멱등)
+        """
+        return CurrencyLockService._settle_many(auction_id, lock_ids, 'released')
+
+    @staticmethod
+    def consume_many(
+        auction_id: int,
+        lock_ids: Optional[List[str]] = None
+    ) -> Dict[str, int]:
+        """재화 잠금 일괄 확정 (실제 차감)"""
+        return CurrencyLockService._settle_many(auction_id, lock_ids, 'consumed')
+
 
 class BidService:
     """프로덕션급 입찰 서비스"""
@@ -489,7 +837,7 @@ class BidService:
         입찰 처리
         
         단계:
-        1. 재화 잠금
+        1. 재화 잠금 (조건부 UPDATE fast path)
         2. 경매 검증 및 업데이트
         3. 이전 입찰자 잠금 해제 (비동기)
         4. 알림 발송 (비동기)
@@ -498,7 +846,7 @@ class BidService:
         
         try:
             # === 1. 재화 잠금 ===
-            lock_result = CurrencyLockService.acquire_currency_lock(
+            lock_result = CurrencyLockService.acquire_currency_lock_fast(
                 user_id,
                 auction_id,
                 bid_amount
@@ -631,6 +979,58 @@ class BidService:
                 'step': 'unexpected'
             }
 
+    @staticmethod
+    def finalize_auction(auction_id: int) -> Dict[str, Any]:
+        """
+        경매 종료
+
+        낙찰 잠금 1건 consume + 나머지 잠금 release_many
+        → 입찰자 수와 무관하게 한 트랜잭션 안의 몇 개 쿼리로 정산
+        """
+        from .models import Auction, CurrencyLock
+
+        with transaction.atomic():
+            auction = Auction.objects.select_for_update().get(id=auction_id)
+
+            if auction.status != 'active':
+                raise Exception('Auction already finalized')
+
+            consumed = {'locks': 0, 'users': 0, 'amount': 0}
+            winner_id = auction.current_winner_id
+
+            if winner_id:
+                # 낙찰가와 같은 잠금만 확정, 같은 유저의 이전 잠금은 release 대상
+                winner_lock_id = CurrencyLock.objects.filter(
+                    user_id=winner_id,
+                    auction_id=auction_id,
+                    amount=auction.current_price,
+                    status='locked'
+                ).order_by('-locked_at').values_list('lock_id', flat=True).first()
+
+                if winner_lock_id is None:
+                    # 만료/정리된 잠금 → 차감 없이 종료하면 낙찰자 재화만 풀리므로 전체 롤백, 경매는 active 유지
+                    logger.error(
+                        f"Winner lock not found: user={winner_id}, auction={auction_id}"
+                    )
+                    raise CurrencyLock.DoesNotExist('Winner lock not found')
+
+                consumed = CurrencyLockService.consume_many(
+                    auction_id, [winner_lock_id]
+                )
+
+            released = CurrencyLockService.release_many(auction_id)
+
+            auction.status = 'ended'
+            auction.save(update_fields=['status'])
+
+        return {
+            'success': True,
+            'winner_id': winner_id,
+            'final_price': auction.current_price,
+            'consumed': consumed,
+            'released': released
+        }
+
 
 # tasks.py (Celery 비동기 작업)
 from celery import shared_task
@@ -690,6 +1090,46 @@ def send_bid_notifications(auction_id, user_id, amount):
     pass
 
 
+def _expire_currency_lock(lock) -> bool:
+    """
+    잠금 1건 만료 처리
+
+    상태 전이를 조건부 UPDATE로 먼저 수행 → 다른 경로에서 이미
+    해제/확정된 잠금은 건너뜀 (중복 차감 방지)
+    """
+    from .models import CurrencyLock, UserCurrency
+    
+    try:
+        with transaction.atomic():
+            updated = CurrencyLock.objects.filter(
+                pk=lock.pk,
+                status='locked'
+            ).update(status='expired')
+            
+            if not updated:
+                return False
+            
+            # 음수가 되면 CHECK 제약조건 위반 → 이 잠금만 롤백되고 로그로 남음
+            UserCurrency.objects.filter(user_id=lock.user_id).update(
+                locked_amount=F('locked_amount') - lock.amount
+            )
+            
+            CurrencyLedger.append(
+                lock.user_id, 'expire', locked_delta=-lock.amount,
+                auction_id=lock.auction_id, lock_id=lock.lock_id
+            )
+        
+        logger.warning(
+            f"Cleaned expired lock: user={lock.user_id}, "
+            f"auction={lock.auction_id}, amount={lock.amount}"
+        )
+        return True
+        
+    except Exception as e:
+        logger.error(f"Failed to clean lock {lock.id}: {e}")
+        return False
+
+
 @shared_task
 def cleanup_expired_locks():
     """
@@ -697,7 +1137,7 @@ def cleanup_expired_locks():
     
     Celery Beat로 주기적 실행
     """
-    from .models import CurrencyLock, UserCurrency
+    from .models import CurrencyLock
     from django.utils import timezone
     from datetime import timedelta
     
@@ -706,35 +1146,393 @@ def cleanup_expired_locks():
     expired_locks = CurrencyLock.objects.filter(
         status='locked',
         locked_at__lt=expired_time
+    ).exclude(
+        auction__status='active'  # 진행 중인 경매의 최고 입찰 잠금은 유지
     )
     
     cleaned_count = 0
     
     for lock in expired_locks:
-        try:
-            with transaction.atomic():
-                user_currency = UserCurrency.objects.select_for_update().get(
-                    user_id=lock.user_id
-                )
-                
-                user_currency.locked_amount -= lock.amount
-                if user_currency.locked_amount < 0:
-                    user_currency.locked_amount = 0
-                
-                user_currency.save()
-                
-                lock.status = 'expired'
-                lock.save()
-                
-                cleaned_count += 1
-                
-                logger.warning(
-                    f"Cleaned expired lock: user={lock.user_id}, "
-                    f"auction={lock.auction_id}, amount={lock.amount}"
-                )
-                
-        except Exception as e:
-            logger.error(f"Failed to clean lock {lock.id}: {e}")
+        if _expire_currency_lock(lock):
+            cleaned_count += 1
     
     logger.info(f"Cleaned {cleaned_count} expired locks")
-    return cleaned_count
\ No newline at end of file
+    return cleaned_count
+
+
+RECONCILE_GRACE_SECONDS = 30  # Redis 기록 ~ DB 커밋 사이 유예
+
+
+@shared_task
+def reconcile_currency_locks(batch_size: int = 500, ops_per_sec: int = 1000):
+    """
+    Redis ↔ DB 잠금 상태 정합성 검사 및 복구
+
+    Celery Beat로 주기적 실행. DB(CurrencyLock)가 원본이고 Redis 해시는 보조 저장소.
+
+    1. Redis → DB: SCAN으로 currency_lock:* 키를 batch_size씩 훑어
+       대응하는 locked 행이 없는 해시는 삭제 (유예 시간 이내의 키는 건너뜀)
+    2. DB → Redis: locked 행을 (status, id) 인덱스로 batch_size씩 훑어
+       - LOCK_TIMEOUT이 지난 잠금은 만료 처리 (진행 중인 경매의 잠금은 제외)
+       - (user, auction)별 최신 locked 행과 Redis 해시를 비교해
+         lock_id/amount가 다르면 DB 기준으로 덮어씀
+         (해시가 아예 없는 건 fast path 잠금이므로 정상)
+
+    Redis/DB 호출은 ops_per_sec 예산 안에서만 실행 (운영 부하 제한)
+    """
+    from .models import CurrencyLock
+
+    throttle = RateLimiter(ops_per_sec)
+    now = timezone.now()
+    stats = {'scanned_keys': 0, 'redis_orphans': 0, 'scanned_rows': 0,
+             'expired': 0, 'rewritten': 0}
+
+    # === 1. Redis → DB ===
+    cursor = 0
+    while True:
+        throttle.wait()
+        cursor, keys = redis_client.scan(
+            cursor=cursor,
+            match='currency_lock:*',
+            count=batch_size
+        )
+
+        if keys:
+            stats['scanned_keys'] += len(keys)
+
+            pipe = redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hmget(key, 'lock_id', 'locked_at')
+            throttle.wait(len(keys))
+            values = pipe.execute()
+
+            lock_ids = [lock_id for lock_id, _ in values if lock_id]
+            throttle.wait()
+            live = set(
+                CurrencyLock.objects.filter(
+                    lock_id__in=lock_ids,
+                    status='locked'
+                ).values_list('lock_id', flat=True)
+            )
+
+            orphans = []
+            for key, (lock_id, locked_at) in zip(keys, values):
+                if lock_id in live:
+                    continue
+                # acquire_currency_lock은 Redis 기록 후 DB 커밋 → 막 생성된 키는 유예
+                if locked_at and _seconds_since(locked_at, now) < RECONCILE_GRACE_SECONDS:
+                    continue
+                orphans.append(key)
+
+            if orphans:
+                throttle.wait(len(orphans))
+                redis_client.delete(*orphans)
+                stats['redis_orphans'] += len(orphans)
+                logger.warning(f"Removed orphan Redis locks: {orphans}")
+
+        if cursor == 0:
+            break
+
+    # === 2. DB → Redis ===
+    expire_before = now - timedelta(seconds=CurrencyLockService.LOCK_TIMEOUT)
+    checked_keys = set()  # Redis 해시는 (user, auction)당 1개 → 실행당 키별로 한 번만 비교
+    last_id = 0
+    while True:
+        throttle.wait()
+        rows = list(
+            CurrencyLock.objects.filter(
+                status='locked',
+                id__gt=last_id
+            ).annotate(
+                auction_status=F('auction__status')
+            ).order_by('id')[:batch_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+        stats['scanned_rows'] += len(rows)
+
+        for lock in rows:
+            # 진행 중인 경매의 잠금은 오래돼도 유효한 최고 입찰일 수 있음 → 종료된 경매만 만료
+            if lock.locked_at < expire_before and lock.auction_status != 'active':
+                # 주인 없는 DB 잠금 → 재화 반환
+                throttle.wait()
+                if _expire_currency_lock(lock):
+                    stats['expired'] += 1
+
+        keys = {(lock.user_id, lock.auction_id) for lock in rows} - checked_keys
+        if not keys:
+            continue
+        checked_keys |= keys
+
+        # 키별 최신 locked 행 (PostgreSQL DISTINCT ON) — Redis 해시는 마지막 잠금을 담고 있음
+        throttle.wait()
+        latest = {}
+        for lock in CurrencyLock.objects.filter(
+            status='locked',
+            user_id__in={user_id for user_id, _ in keys},
+            auction_id__in={auction_id for _, auction_id in keys}
+        ).order_by('user_id', 'auction_id', '-locked_at', '-id').distinct('user_id', 'auction_id'):
+            if (lock.user_id, lock.auction_id) in keys:
+                latest[(lock.user_id, lock.auction_id)] = lock
+
+        locks = list(latest.values())
+        pipe = redis_client.pipeline(transaction=False)
+        for lock in locks:
+            pipe.hmget(
+                CurrencyLockService._get_lock_key(lock.user_id, lock.auction_id),
+                'lock_id', 'amount'
+            )
+        throttle.wait(len(locks))
+        values = pipe.execute()
+
+        pipe = redis_client.pipeline(transaction=False)
+        rewrites = 0
+        for lock, (redis_lock_id, redis_amount) in zip(locks, values):
+            if redis_lock_id is None:
+                continue  # 해시가 아예 없는 건 fast path 잠금이므로 정상
+
+            if redis_lock_id != lock.lock_id or int(redis_amount or 0) != lock.amount:
+                key = CurrencyLockService._get_lock_key(lock.user_id, lock.auction_id)
+                ttl = CurrencyLockService.LOCK_TIMEOUT - int(_seconds_since(lock.locked_at, now))
+                pipe.hset(key, mapping={
+                    'amount': lock.amount,
+                    'locked_at': lock.locked_at.isoformat(),
+                    'lock_id': lock.lock_id,
+                    'user_id': lock.user_id,
+                    'auction_id': lock.auction_id
+                })
+                pipe.expire(key, max(ttl, 1))
+                rewrites += 1
+
+        if rewrites:
+            throttle.wait(rewrites)
+            pipe.execute()
+            stats['rewritten'] += rewrites
+
+    logger.info(f"Currency lock reconciliation: {stats}")
+    return stats
+
+
+def _seconds_since(value, now) -> float:
+    """ISO 문자열 또는 datetime 기준 경과 초"""
+    if isinstance(value, str):
+        from datetime import datetime
+        value = datetime.fromisoformat(value)
+    return (now - value).total_seconds()
+
+@shared_task
+def take_currency_snapshots():
+    """
+    원장 스냅샷 생성
+
+    Celery Beat로 주기적 실행.
+    직전 스냅샷 경계 이후의 원장 델타를 사용자별로 합산해 새 스냅샷을 INSERT
+    """
+    from .models import CurrencyJournalEntry, CurrencyBalanceSnapshot
+
+    lag_cutoff = timezone.now() - timedelta(seconds=CurrencyLedger.SNAPSHOT_LAG_SECONDS)
+    high = CurrencyJournalEntry.objects.filter(
+        created_at__lt=lag_cutoff
+    ).aggregate(m=Max('id'))['m']
+    low = CurrencyBalanceSnapshot.objects.aggregate(m=Max('last_entry_id'))['m'] or 0
+
+    if high is None or high <= low:
+        return 0
+
+    # (low, high] 구간 델타를 사용자별로 한 번에 합산
+    deltas = {
+        row['user_id']: row
+        for row in CurrencyJournalEntry.objects.filter(
+            id__gt=low, id__lte=high
+        ).values('user_id').annotate(
+            total=Sum('total_delta'),
+            locked=Sum('locked_delta')
+        )
+    }
+
+    created = 0
+    user_ids = list(deltas)
+    batch_size = CurrencyLedger.RECONCILE_BATCH_SIZE
+
+    for i in range(0, len(user_ids), batch_size):
+        chunk = user_ids[i:i + batch_size]
+
+        # 사용자별 최신 스냅샷 (PostgreSQL DISTINCT ON)
+        previous = {
+            snap.user_id: snap
+            for snap in CurrencyBalanceSnapshot.objects.filter(
+                user_id__in=chunk
+            ).order_by('user_id', '-last_entry_id').distinct('user_id')
+        }
+
+        snapshots = []
+        for user_id in chunk:
+            prev = previous.get(user_id)
+            delta = deltas[user_id]
+            snapshots.append(CurrencyBalanceSnapshot(
+                user_id=user_id,
+                total_amount=(prev.total_amount if prev else 0) + delta['total'],
+                locked_amount=(prev.locked_amount if prev else 0) + delta['locked'],
+                last_entry_id=high
+            ))
+
+        CurrencyBalanceSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+        created += len(snapshots)
+
+    logger.info(f"Currency snapshots taken: users={created}, entries=({low}, {high}]")
+    return created
+
+
+@shared_task
+def reconcile_currency_snapshots():
+    """
+    스냅샷 검증
+
+    미검증 스냅샷을 원장 전체 합계로 다시 계산해 비교.
+    일치하면 verified_at 기록, 불일치하면 에러 로그 (스냅샷은 수정하지 않음)
+    """
+    from .models import CurrencyJournalEntry, CurrencyBalanceSnapshot
+
+    batch_size = CurrencyLedger.RECONCILE_BATCH_SIZE
+    verified = 0
+    mismatched = 0
+    last_pk = 0
+
+    while True:
+        snapshots = list(
+            CurrencyBalanceSnapshot.objects.filter(
+                verified_at__isnull=True,
+                pk__gt=last_pk
+            ).order_by('pk')[:batch_size]
+        )
+        if not snapshots:
+            break
+        last_pk = snapshots[-1].pk
+
+        # 같은 경계(last_entry_id)끼리 묶어서 사용자별 합계를 한 번에 조회
+        by_boundary = defaultdict(list)
+        for snap in snapshots:
+            by_boundary[snap.last_entry_id].append(snap)
+
+        ok_ids = []
+        for boundary, group in by_boundary.items():
+            sums = {
+                row['user_id']: row
+                for row in CurrencyJournalEntry.objects.filter(
+                    user_id__in=[snap.user_id for snap in group],
+                    id__lte=boundary
+                ).values('user_id').annotate(
+                    total=Sum('total_delta'),
+                    locked=Sum('locked_delta')
+                )
+            }
+
+            for snap in group:
+                row = sums.get(snap.user_id, {'total': 0, 'locked': 0})
+                if (row['total'], row['locked']) == (snap.total_amount, snap.locked_amount):
+                    ok_ids.append(snap.pk)
+                else:
+                    mismatched += 1
+                    logger.error(
+                        f"Currency snapshot mismatch: user={snap.user_id}, "
+                        f"entry<={boundary}, snapshot=({snap.total_amount}, {snap.locked_amount}), "
+                        f"journal=({row['total']}, {row['locked']})"
+                    )
+
+        CurrencyBalanceSnapshot.objects.filter(pk__in=ok_ids).update(
+            verified_at=timezone.now()
+        )
+        verified += len(ok_ids)
+
+    logger.info(f"Currency snapshots reconciled: verified={verified}, mismatched={mismatched}")
+    return mismatched
+
+
+@shared_task
+def reconcile_currency_balances():
+    """
+    UserCurrency ↔ 원장 잔액 검증
+
+    Celery Beat로 주기적 실행. UserCurrency를 user_id 순으로 batch 단위로 훑어
+    (최신 스냅샷 + 이후 델타)와 비교.
+    1차 비교는 잠금 없이 일괄 조회 → 어긋난 사용자만 UserCurrency 행을 잠그고
+    CurrencyLedger.balance()로 다시 확인 (진행 중인 트랜잭션 때문에 생긴 오탐 제거).
+    불일치는 에러 로그만 남김 (자동 수정하지 않음)
+    """
+    from .models import CurrencyJournalEntry, CurrencyBalanceSnapshot, UserCurrency
+
+    batch_size = CurrencyLedger.RECONCILE_BATCH_SIZE
+    checked = 0
+    mismatched = 0
+    last_user_id = 0
+
+    while True:
+        rows = list(
+            UserCurrency.objects.filter(
+                user_id__gt=last_user_id
+            ).order_by('user_id').values_list(
+                'user_id', 'total_amount', 'locked_amount'
+            )[:batch_size]
+        )
+        if not rows:
+            break
+        last_user_id = rows[-1][0]
+        user_ids = [row[0] for row in rows]
+
+        # 사용자별 최신 스냅샷 (PostgreSQL DISTINCT ON)
+        snapshots = {
+            snap.user_id: snap
+            for snap in CurrencyBalanceSnapshot.objects.filter(
+                user_id__in=user_ids
+            ).order_by('user_id', '-last_entry_id').distinct('user_id')
+        }
+
+        # 같은 경계(last_entry_id)끼리 묶어서 이후 델타를 한 번에 합산
+        by_boundary = defaultdict(list)
+        for user_id in user_ids:
+            snap = snapshots.get(user_id)
+            by_boundary[snap.last_entry_id if snap else 0].append(user_id)
+
+        deltas = {}
+        for boundary, group in by_boundary.items():
+            for row in CurrencyJournalEntry.objects.filter(
+                user_id__in=group,
+                id__gt=boundary
+            ).values('user_id').annotate(
+                total=Sum('total_delta'),
+                locked=Sum('locked_delta')
+            ):
+                deltas[row['user_id']] = row
+
+        suspects = []
+        for user_id, total, locked in rows:
+            snap = snapshots.get(user_id)
+            delta = deltas.get(user_id, {'total': 0, 'locked': 0})
+            ledger = (
+                (snap.total_amount if snap else 0) + delta['total'],
+                (snap.locked_amount if snap else 0) + delta['locked'],
+            )
+            if ledger != (total, locked):
+                suspects.append(user_id)
+
+        # 행 잠금 → 그 사용자의 진행 중인 쓰기(UPDATE + 원장 INSERT)가 끝난 뒤 재확인
+        for user_id in suspects:
+            with transaction.atomic():
+                currency = UserCurrency.objects.select_for_update().get(user_id=user_id)
+                ledger = CurrencyLedger.balance(user_id)
+
+            if (ledger['total_amount'], ledger['locked_amount']) != (
+                currency.total_amount, currency.locked_amount
+            ):
+                mismatched += 1
+                logger.error(
+                    f"Currency balance mismatch: user={user_id}, "
+                    f"user_currency=({currency.total_amount}, {currency.locked_amount}), "
+                    f"ledger=({ledger['total_amount']}, {ledger['locked_amount']})"
+                )
+
+        checked += len(rows)
+
+    logger.info(f"Currency balances reconciled: checked={checked}, mismatched={mismatched}")
+    return mismatched
@@ -0,0 +1,79 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.utils import timezone
+from .models import Auction, CurrencyLock, UserCurrency
+from .services.currency_service import BidService, CurrencyLockService, redis_client
+from .tasks import reconcile_currency_locks
+
+pytestmark = pytest.mark.django_db
+
+def _bidder(name, total=1000, locked=0):
+    user = User.objects.create_user(name, password='pw')
+    UserCurrency.objects.create(user=user, total_amount=total, locked_amount=locked)
+    return user
+
+def test_finalize_auction_without_winner_lock_rolls_back():
+    winner, other = _bidder('winner'), _bidder('other', locked=50)
+    auction = Auction.objects.create(title='a', current_price=100, current_winner=winner)
+    # 낙찰 잠금은 이미 만료됨, 다른 입찰자 잠금은 남아 있음
+    CurrencyLock.objects.create(user=winner, auction=auction, amount=100, status='expired')
+    CurrencyLock.objects.create(user=other, auction=auction, amount=50)
+
+    with pytest.raises(CurrencyLock.DoesNotExist):
+        BidService.finalize_auction(auction.id)
+
+    auction.refresh_from_db()
+    assert auction.status == 'active'  # 재정산 가능하도록 그대로
+    assert CurrencyLock.objects.get(user=other).status == 'locked'
+    assert UserCurrency.objects.get(user=other).locked_amount == 50
+    assert UserCurrency.objects.get(user=winner).total_amount == 1000  # 차감 없음
+
+@pytest.fixture
+def redis_locks():
+    import redis
+    try:
+        redis_client.ping()
+    except redis.ConnectionError:
+        pytest.skip('Redis 필요')
+    yield
+    for key in redis_client.scan_iter(match='currency_lock:*'):
+        redis_client.delete(key)
+
+def _old_lock(user, auction, amount):
+    lock = CurrencyLock.objects.create(user=user, auction=auction, amount=amount)
+    CurrencyLock.objects.filter(pk=lock.pk).update(
+        locked_at=timezone.now() - timedelta(seconds=CurrencyLockService.LOCK_TIMEOUT + 60)
+    )
+    lock.refresh_from_db()
+    return lock
+
+def test_reconcile_expires_stale_locks_only_on_ended_auctions(redis_locks):
+    user = _bidder('u', locked=150)
+    live = Auction.objects.create(title='live', current_price=100, current_winner=user)
+    ended = Auction.objects.create(title='ended', status='ended')
+    winning = _old_lock(user, live, 100)
+    stale = _old_lock(user, ended, 50)
+
+    stats = reconcile_currency_locks()
+
+    assert stats['expired'] == 1
+    assert CurrencyLock.objects.get(pk=winning.pk).status == 'locked'
+    assert CurrencyLock.objects.get(pk=stale.pk).status == 'expired'
+    assert UserCurrency.objects.get(user=user).locked_amount == 100
+
+def test_reconcile_compares_redis_hash_with_latest_lock_per_key(redis_locks):
+    user = _bidder('u', locked=300)
+    auction = Auction.objects.create(title='a', current_price=200, current_winner=user)
+    CurrencyLock.objects.create(user=user, auction=auction, amount=100)
+    newest = CurrencyLock.objects.create(user=user, auction=auction, amount=200)
+    CurrencyLock.objects.filter(pk=newest.pk).update(locked_at=timezone.now() + timedelta(seconds=1))
+
+    key = CurrencyLockService._get_lock_key(user.id, auction.id)
+    redis_client.hset(key, mapping={'lock_id': newest.lock_id, 'amount': 200,
+                                    'locked_at': timezone.now().isoformat()})
+
+    # 같은 (user, auction)의 locked 행이 여러 개여도 해시를 번갈아 덮어쓰지 않음
+    assert reconcile_currency_locks()['rewritten'] == 0
+    assert reconcile_currency_locks()['rewritten'] == 0
+    assert redis_client.hget(key, 'lock_id') == newest.lock_id
@@ -0,0 +1,80 @@
+from decimal import Decimal
+from typing import NamedTuple
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Product
+
+# SKU → (id, price, version) read-through 캐시
+# 가격은 하루 몇 번 바뀌고 분당 수만 번 읽힘 → 주문 생성/목록에서 Product 조회를 캐시로 대체
+# 재고는 캐시하지 않음 (차감은 항상 DB 조건부 UPDATE)
+# 주의: queryset.update()는 시그널이 안 불림 → 일괄 가격 변경 후 invalidate() 직접 호출
+CATALOG_TTL = 60 * 60  # 초, 시그널 누락 대비 상한
+
+class CatalogEntry(NamedTuple):
+    id: int
+    sku: str
+    price: Decimal
+    version: int
+    sharded: bool
+
+def _sku_key(sku: str) -> str:
+    return f"catalog:sku:{sku}"
+
+def _id_key(pk: int) -> str:
+    return f"catalog:id:{pk}"
+
+def _entry(p: Product) -> CatalogEntry:
+    return CatalogEntry(p.pk, p.sku, p.price, p.version, p.sharded)
+
+def _fill(entries: list[CatalogEntry]) -> None:
+    # add: 이미 있는 (더 최신일 수 있는) 값은 덮어쓰지 않음
+    # → 느린 읽기가 저장 직후 write-through 된 값을 옛 값으로 되돌리는 경쟁 방지
+    for e in entries:
+        cache.add(_sku_key(e.sku), e, CATALOG_TTL)
+        cache.add(_id_key(e.id), e, CATALOG_TTL)
+
+def get_by_skus(skus) -> dict[str, CatalogEntry]:
+    """없는 SKU는 결과에서 빠짐"""
+    skus = set(skus)
+    found = cache.get_many([_sku_key(s) for s in skus])
+    result = {e.sku: e for e in found.values()}
+    missing = skus - result.keys()
+    if missing:
+        loaded = [
+            _entry(p) for p in
+            Product.objects.filter(sku__in=missing).only("id", "sku", "price", "version", "sharded")
+        ]
+        _fill(loaded)
+        result.update((e.sku, e) for e in loaded)
+    return result
+
+def get_by_ids(ids) -> dict[int, CatalogEntry]:
+    """주문 목록 등에서 item.product_id → sku/가격 (Product JOIN 없이)"""
+    ids = set(ids)
+    found = cache.get_many([_id_key(i) for i in ids])
+    result = {e.id: e for e in found.values()}
+    missing = ids - result.keys()
+    if missing:
+        loaded = [
+            _entry(p) for p in
+            Product.objects.filter(pk__in=missing).only("id", "sku", "price", "version", "sharded")
+        ]
+        _fill(loaded)
+        result.update((e.id, e) for e in loaded)
+    return result
+
+def invalidate(*products: Product) -> None:
+    cache.delete_many([k for p in products for k in (_sku_key(p.sku), _id_key(p.pk))])
+
+@receiver(post_save, sender=Product)
+def _product_saved(sender, instance, **kwargs):
+    # 삭제 대신 새 값으로 write-through (SKU 변경 대비 옛 키는 TTL로 만료)
+    # 커밋 후에만 반영 → 롤백된 가격이 캐시에 남지 않음
+    e = _entry(instance)
+    transaction.on_commit(lambda: cache.set_many({_sku_key(e.sku): e, _id_key(e.id): e}, CATALOG_TTL))
+
+@receiver(post_delete, sender=Product)
+def _product_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate(instance))
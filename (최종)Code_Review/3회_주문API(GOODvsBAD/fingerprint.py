@@ -0,0 +1,61 @@
+import hashlib
+import json
+from decimal import Decimal
+
+
+def _default(o):
+    if isinstance(o, Decimal):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+# 정규형: 키 정렬 + 공백 없음 → 같은 데이터는 항상 같은 바이트
+_CANONICAL = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+# 저장되는 다이제스트 = "<알고리즘>:<hex>" → 배포/설치 환경이 달라도 다른 알고리즘 값끼리 비교하지 않음
+FAST_ALGORITHM = "b2b128"  # blake2b-128: 표준 라이브러리라 어디서나 같은 값, sha256보다 빠름
+SAFE_ALGORITHM = "sha256"
+
+
+def _hasher(fast: bool):
+    """
+    fast=True: 충돌 저항성만 필요한 경우 (예: 사용자 범위로 한정된 멱등성 키) → blake2b-128
+    fast=False: sha256
+    선택 의존성(xxhash 등) 유무로 알고리즘이 바뀌지 않도록 고정
+    """
+    if fast:
+        return FAST_ALGORITHM, hashlib.blake2b(digest_size=16)
+    return SAFE_ALGORITHM, hashlib.sha256()
+
+
+def fingerprint_bytes(raw: bytes, *, fast: bool = False) -> str:
+    """원본 바이트를 그대로 해시 (직렬화 비용 0)"""
+    name, h = _hasher(fast)
+    h.update(raw)
+    return f"{name}:{h.hexdigest()}"
+
+
+def same_request(stored: str, current: str) -> bool:
+    """
+    저장된 다이제스트와 현재 요청 비교.
+    접두사 없는 값은 이 형식 이전에 저장된 레거시 sha256(검증 데이터 json.dumps 기준)이라
+    다시 계산할 수 없음 → 키 일치만으로 같은 요청으로 취급 (KEY_RETENTION 이후 purge로 사라짐)
+    """
+    return stored == current or ":" not in stored
+
+
+def fingerprint(data, *, fast: bool = False) -> str:
+    """
+    파싱된 데이터의 정규형 해시 (포맷만 다른 동일 요청도 같은 값).
+    json.dumps(sort_keys=True)와 달리 정규형이 고정되어 있고 Decimal도 처리.
+    C 인코더(one-shot)가 순수 파이썬 iterencode 스트리밍보다 빨라서 한 번에 인코딩
+    """
+    return fingerprint_bytes(_CANONICAL.encode(data).encode(), fast=fast)
+
+
+def request_fingerprint(request, *, fast: bool = True) -> str:
+    """
+    요청 본문 바이트 해시. request.data 보다 먼저 호출해야 함
+    (DRF가 스트림을 먼저 읽으면 request.body에 접근할 수 없음)
+    """
+    return fingerprint_bytes(request.body, fast=fast)
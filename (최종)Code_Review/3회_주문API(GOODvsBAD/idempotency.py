@@ -0,0 +1,121 @@
+import time
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from .models_idem import IdempotencyKey
+
+# 1차: 캐시(로컬 메모리/Redis, settings.CACHES) / 2차: DB(IdempotencyKey, 영구 기록)
+CACHE_TTL = 60 * 60 * 24          # 초, 완료 응답 캐시 유지 시간
+KEY_RETENTION = timedelta(days=1)  # DB 보존 기간 (클라이언트 재시도 창보다 길게)
+IN_FLIGHT = 0                      # status_code 센티널: 처리 중
+IN_FLIGHT_TIMEOUT = timedelta(seconds=30)  # 이보다 오래된 처리 중 키는 원 요청이 죽은 것으로 보고 인계
+WAIT_TIMEOUT = 2.0                 # 중복 요청이 결과를 기다리는 최대 시간(초)
+WAIT_INTERVAL = 0.05
+
+class IdempotencyConflict(Exception):
+    """같은 키의 다른 요청이 처리 중이거나, 처리 권한을 잃음 → 409"""
+
+def _cache_key(user_id, key: str) -> str:
+    return f"idem:{user_id}:{key}"
+
+def get_cached_response(user_id, key: str):
+    """완료된 응답만 캐시됨 → (request_hash, status_code, body) 또는 None"""
+    return cache.get(_cache_key(user_id, key))
+
+def cache_response(user_id, key: str, request_hash: str, status_code: int, body) -> None:
+    cache.set(_cache_key(user_id, key), (request_hash, status_code, body), CACHE_TTL)
+
+def claim(user, key: str, request_hash: str):
+    """
+    키 선점 (행 잠금 없음): (rec, is_owner)
+
+    처리 중 표시(status_code=0)를 짧은 트랜잭션으로 먼저 커밋해 두면,
+    중복 요청은 잠금 대기 없이 조회만으로 '처리 중'을 알 수 있다.
+    """
+    try:
+        with transaction.atomic():
+            rec = IdempotencyKey.objects.create(
+                key=key, user=user, request_hash=request_hash,
+                status_code=IN_FLIGHT, response_body={},
+            )
+        return rec, True
+    except IntegrityError:
+        pass
+
+    rec = IdempotencyKey.objects.filter(key=key, user=user).first()
+    if rec is None:  # 다른 사용자가 같은 키를 사용 중
+        raise IdempotencyConflict(key)
+
+    # 원 요청이 죽어서 방치된 처리 중 키 → created_at을 토큰 삼아 조건부 인계
+    if rec.status_code == IN_FLIGHT and rec.created_at < timezone.now() - IN_FLIGHT_TIMEOUT:
+        now = timezone.now()
+        taken = IdempotencyKey.objects.filter(
+            pk=rec.pk, status_code=IN_FLIGHT, created_at=rec.created_at,
+        ).update(created_at=now, request_hash=request_hash)
+        if taken:
+            rec.created_at, rec.request_hash = now, request_hash
+            return rec, True
+        rec.refresh_from_db()
+    return rec, False
+
+def complete(rec, status_code: int, body) -> None:
+    """
+    처리 결과 기록. 반드시 비즈니스 로직과 같은 트랜잭션 안에서 호출할 것:
+    그 사이 다른 요청이 키를 인계했다면 예외로 전체 롤백 → 주문 중복 생성 방지
+    """
+    updated = IdempotencyKey.objects.filter(
+        pk=rec.pk, status_code=IN_FLIGHT, created_at=rec.created_at,
+    ).update(status_code=status_code, response_body=body)
+    if not updated:
+        raise IdempotencyConflict(rec.key)
+    user_id, key, request_hash = rec.user_id, rec.key, rec.request_hash
+    transaction.on_commit(lambda: cache_response(user_id, key, request_hash, status_code, body))
+
+def release(rec) -> None:
+    """처리 실패 시 키 반납 → 클라이언트가 같은 키로 재시도 가능"""
+    IdempotencyKey.objects.filter(pk=rec.pk, status_code=IN_FLIGHT, created_at=rec.created_at).delete()
+
+def _completed_from_db(user_id, key: str):
+    """DB에 기록된 완료 응답 (request_hash, status_code, body) 또는 None"""
+    return (
+        IdempotencyKey.objects.filter(user_id=user_id, key=key)
+        .exclude(status_code=IN_FLIGHT)
+        .values_list("request_hash", "status_code", "response_body")
+        .first()
+    )
+
+def wait_for_completion(user_id, key: str, *, timeout: float = WAIT_TIMEOUT):
+    """
+    원 요청 완료를 캐시로 기다림 → 완료 응답 (request_hash, status_code, body) 또는 None(타임아웃)
+
+    대기 전에 DB 커넥션을 반납 (sleep 동안 커넥션 풀/pgbouncer 슬롯을 잡지 않음),
+    트랜잭션 안이라 반납할 수 없으면 기다리지 않고 바로 None.
+    캐시가 프로세스 로컬(LocMemCache)이면 다른 프로세스의 완료를 못 보므로
+    마지막에 DB를 한 번 더 확인 (운영에서는 Redis 등 공유 캐시 사용)
+    """
+    if connection.in_atomic_block:
+        return None
+    connection.close()
+
+    deadline = time.monotonic() + timeout
+    while True:
+        cached = get_cached_response(user_id, key)
+        if cached:
+            return cached
+        if time.monotonic() >= deadline:
+            return _completed_from_db(user_id, key)
+        time.sleep(WAIT_INTERVAL)
+
+def purge_expired_keys(*, older_than: timedelta = KEY_RETENTION, batch_size: int = 5000) -> int:
+    """보존 기간이 지난 키를 배치 단위로 삭제 (cron/Celery beat에서 주기 실행)"""
+    cutoff = timezone.now() - older_than
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(created_at__lt=cutoff)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
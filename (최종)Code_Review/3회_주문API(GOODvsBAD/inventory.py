@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from .models import Product, ProductStockShard
+from . import catalog
+
+# 인기 상품(sharded=True)은 재고를 SHARD_COUNT개 카운터 행으로 분할
+# → 동시 주문이 서로 다른 행을 UPDATE 하므로 한 행 잠금에 줄 서지 않음
+SHARD_COUNT = 8
+
+def enable_sharding(product_id: int, shards: int = SHARD_COUNT) -> None:
+    """Product.stock을 샤드 행으로 균등 분배하고 sharded 모드로 전환"""
+    with transaction.atomic():
+        p = Product.objects.select_for_update().get(pk=product_id)
+        if p.sharded:
+            return
+        base, rest = divmod(p.stock, shards)
+        ProductStockShard.objects.bulk_create([
+            ProductStockShard(product=p, shard_no=i, stock=base + (1 if i < rest else 0))
+            for i in range(shards)
+        ])
+        Product.objects.filter(pk=p.pk).update(stock=0, sharded=True)
+        # update()는 post_save를 안 부름 → 카탈로그의 sharded 값은 직접 무효화
+        transaction.on_commit(lambda: catalog.invalidate(p))
+
+def reserve_sharded(product_id: int, qty: int) -> bool:
+    """
+    샤드 재고 차감. 반드시 atomic 안에서 호출
+
+    1) 재고가 충분한 샤드 중 다른 트랜잭션이 잡고 있지 않은 첫 샤드를 SKIP LOCKED로 선점 후 차감
+       → 잠긴 샤드는 기다리지 않고 건너뜀 (샤딩의 목적)
+    2) 한 샤드로 부족하거나 전부 잠겨 있으면 전체 샤드를 shard_no 순으로 잠그고 나눠서 차감
+    샤드 순서는 항상 shard_no (무작위 순서는 여러 상품을 잠그는 주문끼리 교착 위험)
+    """
+    shard = (
+        ProductStockShard.objects.select_for_update(skip_locked=True)
+        .filter(product_id=product_id, stock__gte=qty)
+        .order_by("shard_no").only("pk").first()
+    )
+    if shard is not None:
+        ProductStockShard.objects.filter(pk=shard.pk).update(stock=F("stock") - qty)
+        return True
+
+    shards = list(
+        ProductStockShard.objects.select_for_update()
+        .filter(product_id=product_id, stock__gt=0).order_by("shard_no")
+    )
+    if sum(s.stock for s in shards) < qty:
+        return False
+    need = qty
+    for s in shards:
+        take = min(s.stock, need)
+        ProductStockShard.objects.filter(pk=s.pk).update(stock=F("stock") - take)
+        need -= take
+        if not need:
+            break
+    return True
+
+def rebalance_shards(product_id: int) -> None:
+    """샤드 간 재고 재분배 (한쪽으로 쏠려 1)의 빠른 경로가 실패하는 것을 방지)"""
+    with transaction.atomic():
+        shards = list(
+            ProductStockShard.objects.select_for_update()
+            .filter(product_id=product_id).order_by("shard_no")
+        )
+        if not shards:
+            return
+        base, rest = divmod(sum(s.stock for s in shards), len(shards))
+        for i, s in enumerate(shards):
+            s.stock = base + (1 if i < rest else 0)
+        ProductStockShard.objects.bulk_update(shards, ["stock"])
+
+def rebalance_all() -> None:
+    """주기 작업(Celery beat 등)에서 호출: 상품마다 짧은 트랜잭션으로 나눠 재분배"""
+    for pk in Product.objects.filter(sharded=True).values_list("pk", flat=True).iterator():
+        rebalance_shards(pk)
+
+def with_available_stock(qs=None):
+    """
+    재고 조회용 annotate: available_stock = sharded면 샤드 합계, 아니면 stock
+    ex) with_available_stock().filter(available_stock__gt=0)
+    """
+    qs = Product.objects.all() if qs is None else qs
+    shard_sum = (
+        ProductStockShard.objects.filter(product=OuterRef("pk"))
+        .values("product").annotate(s=Sum("stock")).values("s")
+    )
+    return qs.annotate(available_stock=Case(
+        When(sharded=True, then=Coalesce(Subquery(shard_sum), 0)),
+        default=F("stock"),
+        output_field=IntegerField(),
+    ))
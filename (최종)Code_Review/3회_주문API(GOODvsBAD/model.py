@@ -7,6 +7,26 @@ class Product(models.Model):
     sku = models.CharField(max_length=50, unique=True)
     price = models.DecimalField(max_digits=12, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # True면 재고는 ProductStockShard 행들에 나눠 저장 (stock 컬럼은 사용 안 함, inventory.py 참고)
+    sharded = models.BooleanField(default=False)
+    # 저장할 때마다 +1 → 캐시된 카탈로그 항목이 어느 시점 값인지 구분 (catalog.py)
+    version = models.PositiveIntegerField(default=0)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+        super().save(*args, **kwargs)
+
+class ProductStockShard(models.Model):
+    """인기 상품 재고 분할 카운터: 한 행에 몰리는 UPDATE를 K개 행으로 분산"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_shards")
+    shard_no = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "shard_no"], name="stockshard_product_shard_unique"),
+        ]
 
 class Order(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -14,6 +34,12 @@ class Order(models.Model):
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # 사용자별 최신순 keyset 페이지네이션: WHERE user_id = ? AND (created_at, id) < (?, ?)
+            models.Index(fields=["user", "created_at", "id"], name="order_user_created_idx"),
+        ]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
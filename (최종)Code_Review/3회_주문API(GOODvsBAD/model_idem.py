@@ -3,7 +3,14 @@ from django.db import models
 class IdempotencyKey(models.Model):
     key = models.CharField(max_length=128, unique=True)
     user = models.ForeignKey("users.User", on_delete=models.CASCADE)
-    request_hash = models.CharField(max_length=64)
+    # "<알고리즘>:<hex>" (fingerprint.py). 64 → 80 AlterField 마이그레이션 필요,
+    # 기존 접두사 없는 sha256 행은 그대로 두고 fingerprint.same_request가 레거시로 취급
+    request_hash = models.CharField(max_length=80)
     status_code = models.PositiveSmallIntegerField()
     response_body = models.JSONField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"]),  # TTL 만료 purge용
+        ]
@@ -1,36 +1,114 @@
+from collections import defaultdict
 from decimal import Decimal
-from django.db import transaction
-from django.db.models import F
+from django.db import connection, transaction
 from .models import Product, Order, OrderItem
+from .inventory import reserve_sharded
+from . import catalog
 
-@transaction.atomic
-def create_order(*, user, items: list[dict]) -> Order:
-    # 일괄 조회 + 행 잠금으로 동시성/경쟁조건 방어
-    skus = [i["sku"] for i in items]
-    by_sku = {p.sku: p for p in Product.objects.select_for_update().filter(sku__in=skus)}
+def reserve_stock(qty_by_pk: dict[int, int]) -> list[int]:
+    """
+    여러 상품 재고를 문장 하나로 차감 (PostgreSQL)
+
+        WITH v(id, qty) AS (VALUES (%s, %s), ...),          -- pk 오름차순
+             locked AS MATERIALIZED (
+               SELECT p.id FROM product p JOIN v ON p.id = v.id
+                ORDER BY p.id FOR UPDATE OF p)
+        UPDATE product AS p SET stock = p.stock - v.qty
+          FROM v JOIN locked USING (id)
+         WHERE p.id = v.id AND p.stock >= v.qty
+        RETURNING p.id
+
+    UPDATE ... FROM 만으로는 행 잠금 순서가 조인 계획을 따르므로 [A,B] / [B,A] 주문이 교착될 수 있음
+    → CTE에서 pk 순서로 먼저 잠그고 차감 (잠금 순서가 모든 트랜잭션에서 같음).
+    재고가 모자란 상품은 갱신되지 않음 → 부족한 pk 목록을 반환.
+    일부만 차감된 상태가 남지 않도록 반드시 atomic 안에서 호출하고, 부족분이 있으면 예외로 롤백할 것
+    (4회_코드리뷰_예정/tx_basic.reserve_stock과 같은 SQL — 폴더별 독립 예제라 의도적으로 복사, 고치면 둘 다)
+    """
+    if not qty_by_pk:
+        return []
+    table = connection.ops.quote_name(Product._meta.db_table)
+    values = ", ".join(["(%s, %s)"] * len(qty_by_pk))
+    params = [x for pk in sorted(qty_by_pk) for x in (pk, qty_by_pk[pk])]
+    sql = (
+        f"WITH v(id, qty) AS (VALUES {values}), "
+        f"locked AS MATERIALIZED ("
+        f"SELECT p.id FROM {table} AS p JOIN v ON p.id = v.id ORDER BY p.id FOR UPDATE OF p) "
+        f"UPDATE {table} AS p SET stock = p.stock - v.qty "
+        f"FROM v JOIN locked USING (id) "
+        f"WHERE p.id = v.id AND p.stock >= v.qty "
+        f"RETURNING p.id"
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        reserved = {row[0] for row in cur.fetchall()}
+    return [pk for pk in qty_by_pk if pk not in reserved]
 
-    total = Decimal("0.00")
-    order = Order.objects.create(user=user, total_amount=Decimal("0.00"))
+BULK_BATCH = 1000  # create_orders의 INSERT 한 문장당 행 수
 
-    bulk_items = []
+def _reserve_items(by_sku, items) -> None:
+    """주문 항목 전체의 재고 차감 (같은 SKU는 합산). 부족하면 ValueError → atomic 롤백"""
+    qty_by_pk = defaultdict(int)
+    sharded = set()
     for it in items:
         p = by_sku.get(it["sku"])
         if not p:
             raise ValueError(f"Unknown SKU: {it['sku']}")
-        q = int(it["quantity"])
-        if p.stock < q:
-            raise ValueError(f"Out of stock: {p.sku}")
-        Product.objects.filter(pk=p.pk).update(stock=F("stock") - q)
-        bulk_items.append(OrderItem(order=order, product=p, quantity=q, unit_price=p.price))
-        total += p.price * q
+        qty_by_pk[p.id] += int(it["quantity"])
+        if p.sharded:
+            sharded.add(p.id)
 
-    OrderItem.objects.bulk_create(bulk_items)
-    order.total_amount = total
-    order.save(update_fields=["total_amount"])
+    # 일반 상품은 UPDATE 한 번, 분할 재고 상품은 샤드별 조건부 UPDATE
+    short = reserve_stock({pk: q for pk, q in qty_by_pk.items() if pk not in sharded})
+    short += [pk for pk in sorted(sharded) if not reserve_sharded(pk, qty_by_pk[pk])]  # 상품 pk 순 → 교착 방지
+    if short:
+        sku = next(p.sku for p in by_sku.values() if p.id == short[0])
+        raise ValueError(f"Out of stock: {sku}")  # atomic → 이미 차감된 상품도 롤백
+
+def _build_order(user, items, by_sku):
+    """저장 전 Order/OrderItem 객체 구성. 합계를 먼저 계산해 두므로 주문 INSERT 후 UPDATE가 필요 없음"""
+    lines = [(by_sku[it["sku"]], int(it["quantity"])) for it in items]
+    order = Order(user=user, total_amount=sum((p.price * q for p, q in lines), Decimal("0.00")))
+    # Order.id는 uuid4 기본값이라 INSERT 전에 이미 정해져 있음 → 항목이 바로 참조 가능
+    return order, [OrderItem(order=order, product_id=p.id, quantity=q, unit_price=p.price) for p, q in lines]
+
+@transaction.atomic
+def create_order(*, user, items: list[dict]) -> Order:
+    # 가격/ID는 카탈로그 캐시에서 (DB 조회 없음), 재고는 조건부 UPDATE 한 번으로 차감
+    by_sku = catalog.get_by_skus(i["sku"] for i in items)
+    _reserve_items(by_sku, items)
+
+    # 재고 UPDATE 1 + 주문 INSERT 1 + 항목 bulk INSERT 1
+    order, lines = _build_order(user, items, by_sku)
+    order.save(force_insert=True)
+    OrderItem.objects.bulk_create(lines)
 
     transaction.on_commit(lambda: publish_order_created(order.id))
     return order
 
+@transaction.atomic
+def create_orders(*, user, orders: list[list[dict]]) -> list[Order]:
+    """
+    B2B 일괄 주문: orders = [[{'sku', 'quantity'}, ...], ...]
+    주문 수와 무관하게 재고 UPDATE 1번 + bulk_create 2번 (BULK_BATCH 행 단위로 분할)
+    하나라도 재고가 모자라면 전체 롤백
+    """
+    all_items = [it for items in orders for it in items]
+    by_sku = catalog.get_by_skus(it["sku"] for it in all_items)
+    _reserve_items(by_sku, all_items)
+
+    built = [_build_order(user, items, by_sku) for items in orders]
+    created = Order.objects.bulk_create([o for o, _ in built], batch_size=BULK_BATCH)
+    OrderItem.objects.bulk_create([li for _, lines in built for li in lines], batch_size=BULK_BATCH)
+
+    ids = [o.id for o in created]
+
+    def publish_all():
+        for order_id in ids:
+            publish_order_created(order_id)
+
+    transaction.on_commit(publish_all)
+    return created
+
 def publish_order_created(order_id: str):
     # 실제로는 Celery 등으로 발행
     pass
@@ -0,0 +1,64 @@
+import pytest
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from .models import Product
+from . import catalog
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+
+def _product(price='1.00'):
+    return Product.objects.create(sku='A', price=Decimal(price), stock=1)
+
+def test_save_writes_through_only_after_commit(django_capture_on_commit_callbacks):
+    p = _product()
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        p.price = Decimal('2.00')
+        p.save()
+    assert cache.get(catalog._sku_key('A')) is None  # 커밋 전에는 캐시에 없음
+
+    for callback in callbacks:
+        callback()
+    entry = cache.get(catalog._sku_key('A'))
+    assert (entry.price, entry.version) == (Decimal('2.00'), p.version)
+    assert cache.get(catalog._id_key(p.pk)) == entry
+
+def test_rolled_back_save_leaves_cache_untouched(django_capture_on_commit_callbacks):
+    p = _product()
+    catalog.get_by_skus(['A'])  # 1.00 캐시
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            p.price = Decimal('9.99')
+            p.save()
+            transaction.set_rollback(True)
+
+    assert catalog.get_by_skus(['A'])['A'].price == Decimal('1.00')
+
+def test_delete_evicts_both_keys(django_capture_on_commit_callbacks):
+    p = _product()
+    catalog.get_by_ids([p.pk])
+    pk = p.pk
+
+    with django_capture_on_commit_callbacks(execute=True):
+        p.delete()
+
+    assert cache.get(catalog._sku_key('A')) is None
+    assert cache.get(catalog._id_key(pk)) is None
+
+def test_stale_read_does_not_overwrite_newer_entry(django_capture_on_commit_callbacks):
+    p = _product()
+    stale = catalog._entry(p)  # 느린 읽기가 저장 전에 읽어 둔 값
+
+    with django_capture_on_commit_callbacks(execute=True):
+        p.price = Decimal('2.00')
+        p.save()
+    catalog._fill([stale])  # cache.add → 이미 있는 최신 값 유지
+
+    entry = catalog.get_by_skus(['A'])['A']
+    assert (entry.price, entry.version) == (Decimal('2.00'), p.version)
+    assert catalog.get_by_ids([p.pk])[p.pk] == entry
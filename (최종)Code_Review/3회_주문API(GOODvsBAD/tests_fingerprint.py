@@ -0,0 +1,31 @@
+from decimal import Decimal
+from django.test import RequestFactory
+from .fingerprint import FAST_ALGORITHM, fingerprint, fingerprint_bytes, request_fingerprint, same_request
+
+def test_canonical_form_ignores_key_order_and_handles_decimal():
+    a = {'items': [{'sku': 'A', 'quantity': 2}], 'total': Decimal('3.50')}
+    b = {'total': Decimal('3.50'), 'items': [{'quantity': 2, 'sku': 'A'}]}
+
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(a, fast=True) == fingerprint(b, fast=True)
+    assert fingerprint(a) != fingerprint({**a, 'total': Decimal('3.51')})
+
+def test_digest_is_prefixed_with_algorithm():
+    fast, safe = fingerprint_bytes(b'{}', fast=True), fingerprint_bytes(b'{}')
+
+    assert fast.startswith(f'{FAST_ALGORITHM}:') and len(fast) <= 80  # IdempotencyKey.request_hash
+    assert safe.startswith('sha256:') and len(safe) <= 80
+
+def test_prefix_keeps_other_algorithms_from_matching():
+    current = fingerprint_bytes(b'{}', fast=True)
+    hex_part = current.split(':', 1)[1]
+
+    assert same_request(current, current)
+    assert not same_request(f'xxh3:{hex_part}', current)  # 같은 hex라도 알고리즘이 다르면 다른 요청
+    assert same_request('ab' * 32, current)  # 접두사 없는 레거시 sha256 → 키 일치로 처리
+
+def test_request_fingerprint_hashes_raw_body():
+    body = b'{"items": [{"sku": "A", "quantity": 1}]}'
+    request = RequestFactory().post('/api/orders', data=body, content_type='application/json')
+
+    assert request_fingerprint(request) == fingerprint_bytes(body, fast=True)
@@ -0,0 +1,58 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models_idem import IdempotencyKey
+from . import idempotency
+from .idempotency import IN_FLIGHT, IN_FLIGHT_TIMEOUT, IdempotencyConflict
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+@pytest.fixture
+def user():
+    cache.clear()
+    return get_user_model().objects.create_user('u@test.com', 'pw')
+
+def test_claim_first_request_owns_key(user):
+    rec, owner = idempotency.claim(user, 'k1', 'b2b128:aa')
+    assert owner and rec.status_code == IN_FLIGHT
+
+    dup, owner = idempotency.claim(user, 'k1', 'b2b128:aa')
+    assert not owner and dup.pk == rec.pk  # 처리 중 → 중복 요청은 소유권 없음
+
+def test_claim_takes_over_stale_in_flight_key(user):
+    stale, _ = idempotency.claim(user, 'k1', 'b2b128:aa')
+    IdempotencyKey.objects.filter(pk=stale.pk).update(
+        created_at=timezone.now() - IN_FLIGHT_TIMEOUT - timedelta(seconds=1)
+    )
+    stale.refresh_from_db()
+
+    rec, owner = idempotency.claim(user, 'k1', 'b2b128:aa')
+    assert owner and rec.created_at > stale.created_at
+
+    # 인계당한 원 요청의 complete는 토큰(created_at) 불일치로 실패 → 롤백
+    with pytest.raises(IdempotencyConflict):
+        with transaction.atomic():
+            idempotency.complete(stale, 201, {'id': 'old'})
+    assert IdempotencyKey.objects.get(pk=rec.pk).status_code == IN_FLIGHT
+
+def test_complete_records_response_and_caches_on_commit(user):
+    rec, _ = idempotency.claim(user, 'k1', 'b2b128:aa')
+    with transaction.atomic():
+        idempotency.complete(rec, 201, {'id': '1'})
+
+    assert idempotency.get_cached_response(user.pk, 'k1') == ('b2b128:aa', 201, {'id': '1'})
+    dup, owner = idempotency.claim(user, 'k1', 'b2b128:aa')
+    assert not owner and (dup.status_code, dup.response_body) == (201, {'id': '1'})
+
+    with pytest.raises(IdempotencyConflict):  # 이미 완료된 키는 다시 완료할 수 없음
+        idempotency.complete(rec, 201, {'id': '2'})
+
+def test_wait_for_completion_falls_back_to_db(user):
+    rec, _ = idempotency.claim(user, 'k1', 'b2b128:aa')
+    IdempotencyKey.objects.filter(pk=rec.pk).update(status_code=201, response_body={'id': '1'})
+
+    # 다른 프로세스가 완료해서 이 프로세스 캐시에는 없는 경우
+    assert idempotency.wait_for_completion(user.pk, 'k1', timeout=0) == ('b2b128:aa', 201, {'id': '1'})
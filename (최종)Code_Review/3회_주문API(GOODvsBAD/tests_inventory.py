@@ -0,0 +1,49 @@
+import pytest
+from decimal import Decimal
+from django.db import transaction
+from .models import Product, ProductStockShard
+from .inventory import enable_sharding, rebalance_all, reserve_sharded
+
+pytestmark = pytest.mark.django_db
+
+def _shard_stocks(product):
+    return list(ProductStockShard.objects.filter(product=product).order_by('shard_no').values_list('stock', flat=True))
+
+def _sharded_product(stock=10, shards=4):
+    p = Product.objects.create(sku='HOT', price=Decimal('1.00'), stock=stock)
+    enable_sharding(p.pk, shards=shards)
+    return p
+
+def test_enable_sharding_splits_stock_evenly():
+    p = _sharded_product(10, 4)
+
+    assert _shard_stocks(p) == [3, 3, 2, 2]
+    p.refresh_from_db()
+    assert (p.stock, p.sharded) == (0, True)
+
+    enable_sharding(p.pk, shards=4)  # 이미 sharded → 그대로
+    assert _shard_stocks(p) == [3, 3, 2, 2]
+
+def test_reserve_sharded_takes_first_shard_with_enough_stock():
+    p = _sharded_product(10, 4)
+    with transaction.atomic():
+        assert reserve_sharded(p.pk, 2)
+    assert _shard_stocks(p) == [1, 3, 2, 2]
+
+def test_reserve_sharded_falls_back_to_split_across_shards():
+    p = _sharded_product(10, 4)
+    with transaction.atomic():
+        assert reserve_sharded(p.pk, 5)  # 한 샤드로는 부족 → shard_no 순으로 나눠 차감
+    assert _shard_stocks(p) == [0, 1, 2, 2]
+
+    with transaction.atomic():
+        assert not reserve_sharded(p.pk, 6)  # 합계 5 < 6
+    assert _shard_stocks(p) == [0, 1, 2, 2]
+
+def test_rebalance_all_evens_out_shards():
+    p = _sharded_product(10, 4)
+    ProductStockShard.objects.filter(product=p).update(stock=0)
+    ProductStockShard.objects.filter(product=p, shard_no=3).update(stock=5)
+
+    rebalance_all()
+    assert _shard_stocks(p) == [2, 1, 1, 1]
@@ -0,0 +1,58 @@
+import pytest
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from .models import Order, OrderItem, Product
+from .services import create_order, create_orders, reserve_stock
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture(autouse=True)
+def _postgresql_only():
+    if connection.vendor != 'postgresql':
+        pytest.skip('UPDATE ... FROM (VALUES) / MATERIALIZED CTE: PostgreSQL 전용')
+    cache.clear()  # 카탈로그 캐시에 이전 테스트 상품이 남지 않도록
+
+@pytest.fixture
+def user():
+    return get_user_model().objects.create_user('u@test.com', 'pw')
+
+def test_reserve_stock_returns_short_pks_only():
+    a = Product.objects.create(sku='A', price=Decimal('1.00'), stock=5)
+    b = Product.objects.create(sku='B', price=Decimal('1.00'), stock=1)
+
+    with transaction.atomic():
+        assert reserve_stock({b.pk: 2, a.pk: 3}) == [b.pk]
+        # 부족하지 않은 상품은 차감됨 → 호출부가 예외로 롤백해야 하는 이유
+        assert Product.objects.get(pk=a.pk).stock == 2
+        transaction.set_rollback(True)
+
+def test_create_order_shortfall_rolls_back_every_product(user):
+    Product.objects.create(sku='A', price=Decimal('1.00'), stock=5)
+    Product.objects.create(sku='B', price=Decimal('1.00'), stock=1)
+
+    with pytest.raises(ValueError, match='Out of stock: B'):
+        create_order(user=user, items=[{'sku': 'A', 'quantity': 3}, {'sku': 'B', 'quantity': 2}])
+
+    assert dict(Product.objects.values_list('sku', 'stock')) == {'A': 5, 'B': 1}
+    assert Order.objects.count() == 0
+
+def test_create_orders_reserves_all_stock_in_one_update(user):
+    Product.objects.create(sku='A', price=Decimal('1.50'), stock=10)
+    Product.objects.create(sku='B', price=Decimal('2.00'), stock=10)
+    orders = [
+        [{'sku': 'A', 'quantity': 2}, {'sku': 'B', 'quantity': 1}],
+        [{'sku': 'A', 'quantity': 1}],
+        [{'sku': 'B', 'quantity': 3}],
+    ]
+
+    with CaptureQueriesContext(connection) as ctx:
+        created = create_orders(user=user, orders=orders)
+
+    stock_updates = [q for q in ctx.captured_queries if 'UPDATE' in q['sql'] and 'stock' in q['sql']]
+    assert len(stock_updates) == 1  # 주문 수와 무관하게 재고 UPDATE 1번
+    assert [o.total_amount for o in created] == [Decimal('5.00'), Decimal('1.50'), Decimal('6.00')]
+    assert OrderItem.objects.count() == 4
+    assert dict(Product.objects.values_list('sku', 'stock')) == {'A': 7, 'B': 6}
@@ -0,0 +1,62 @@
+import base64
+import json
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from .models import Order
+from . import view_good
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture
+def user():
+    return get_user_model().objects.create_user('u@test.com', 'pw')
+
+def _orders_with_same_created_at(user, n):
+    for _ in range(n):
+        Order.objects.create(user=user)
+    Order.objects.filter(user=user).update(created_at=timezone.now())  # created_at 동률
+
+def _get(view, user, **params):
+    request = APIRequestFactory().get('/api/orders', params)
+    force_authenticate(request, user=user)
+    return view(request)
+
+def test_list_orders_pages_do_not_overlap_or_skip_on_created_at_ties(user):
+    _orders_with_same_created_at(user, 5)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        resp = _get(view_good.list_orders_view, user, **params)
+        assert resp.status_code == 200
+        seen += [o['id'] for o in resp.data['results']]
+        cursor, pages = resp.data['next'], pages + 1
+        if cursor is None:  # 마지막 페이지에는 다음 커서 없음
+            break
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 5
+    assert set(seen) == {str(pk) for pk in Order.objects.values_list('id', flat=True)}
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'2024-01-01T00:00:00+00:00|not-a-uuid').decode(),
+    base64.urlsafe_b64encode(b'no-separator').decode(),
+])
+def test_list_orders_malformed_cursor_returns_400(user, cursor):
+    assert _get(view_good.list_orders_view, user, cursor=cursor).status_code == 400
+
+def test_export_orders_streams_valid_json_across_chunks(user, monkeypatch):
+    monkeypatch.setattr(view_good, 'EXPORT_CHUNK', 2)  # 청크 경계를 여러 번 넘도록
+    _orders_with_same_created_at(user, 5)
+
+    resp = _get(view_good.export_orders_view, user)
+    data = json.loads(b''.join(resp.streaming_content))
+
+    assert len({o['id'] for o in data['results']}) == 5
+
+def test_export_orders_without_orders_is_valid_json(user):
+    resp = _get(view_good.export_orders_view, user)
+    assert json.loads(b''.join(resp.streaming_content)) == {'results': []}
@@ -1,5 +1,10 @@
-import hashlib, json
+import base64
+import json
+import uuid
+from datetime import datetime
 from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -7,34 +12,142 @@ from rest_framework.response import Response
 
 from .serializers import OrderCreateIn
 from .services import create_order
-from .models_idem import IdempotencyKey
+from . import idempotency
+from .idempotency import IdempotencyConflict, get_cached_response
+from .fingerprint import request_fingerprint, same_request
+from . import catalog
 from .models import Order
 
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_CHUNK = 500
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def create_order_view(request):
+    idem = request.headers.get("Idempotency-Key")
+    # 키가 있을 때만 원본 바이트를 해시 (request.data 접근 전에 해야 함)
+    # 키가 사용자 범위라 비암호 해시로 충분
+    body_hash = request_fingerprint(request, fast=True) if idem else None
+
     ser = OrderCreateIn(data=request.data)
     ser.is_valid(raise_exception=True)
 
-    idem = request.headers.get("Idempotency-Key")
-    body_hash = hashlib.sha256(json.dumps(ser.validated_data, sort_keys=True).encode()).hexdigest()
-
     if idem:
-        with transaction.atomic():
-            rec, created = IdempotencyKey.objects.select_for_update().get_or_create(
-                key=idem, user=request.user,
-                defaults={"request_hash": body_hash, "status_code": 0, "response_body": {}},
-            )
-            if not created and rec.request_hash == body_hash and rec.status_code:
+        # 1차: 캐시에 완료된 응답이 있으면 DB를 건드리지 않고 바로 반환
+        cached = get_cached_response(request.user.pk, idem)
+        if cached and same_request(cached[0], body_hash):
+            return Response(cached[2], status=cached[1])
+
+        # 2차: 행 잠금 없이 키 선점 (처리 중 = status_code 0)
+        try:
+            rec, owner = idempotency.claim(request.user, idem, body_hash)
+        except IdempotencyConflict:
+            return _conflict()
+
+        if not owner:
+            if not same_request(rec.request_hash, body_hash):
+                return Response({"detail": "Idempotency-Key reused with a different request body."},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if rec.status_code:
+                idempotency.cache_response(request.user.pk, idem, rec.request_hash, rec.status_code, rec.response_body)
                 return Response(rec.response_body, status=rec.status_code)
+            # 원 요청이 처리 중 → 잠시 결과를 기다리고, 안 끝나면 409 + Retry-After
+            done = idempotency.wait_for_completion(request.user.pk, idem)
+            if done and same_request(done[0], body_hash):
+                return Response(done[2], status=done[1])
+            return _conflict()
 
-            order = create_order(user=request.user, items=ser.validated_data["items"])
-            payload = {"id": str(order.id), "total": str(order.total_amount)}
-            rec.request_hash, rec.response_body, rec.status_code = body_hash, payload, status.HTTP_201_CREATED
-            rec.save(update_fields=["request_hash", "response_body", "status_code"])
+        try:
+            with transaction.atomic():
+                order = create_order(user=request.user, items=ser.validated_data["items"])
+                payload = {"id": str(order.id), "total": str(order.total_amount)}
+                idempotency.complete(rec, status.HTTP_201_CREATED, payload)
+        except IdempotencyConflict:
+            return _conflict()
+        except Exception:
+            idempotency.release(rec)
+            raise
     else:
         order = create_order(user=request.user, items=ser.validated_data["items"])
         payload = {"id": str(order.id), "total": str(order.total_amount)}
 
     headers = {"Location": f"/api/orders/{order.id}"}
     return Response(payload, status=status.HTTP_201_CREATED, headers=headers)
+
+
+def _conflict():
+    return Response({"detail": "A request with this Idempotency-Key is in progress."},
+                    status=status.HTTP_409_CONFLICT, headers={"Retry-After": "1"})
+
+
+# ----- 주문 목록 (view_bad.list_orders 대체) -----
+# OFFSET 대신 (created_at, id) keyset → 몇 페이지째든 인덱스 범위 스캔 한 번
+# 항목은 페이지당 prefetch 쿼리 1번, SKU는 카탈로그 캐시에서 (Product 조회 없음, N+1 없음)
+
+def _encode_cursor(order) -> str:
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    # 형식이 틀리면 전부 ValueError (base64/UTF-8/split/isoformat/UUID) → 호출부에서 400
+    created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    return datetime.fromisoformat(created_at), uuid.UUID(pk)
+
+def _order_page(user, cursor=None, limit=PAGE_SIZE):
+    """최신순 한 페이지 → (orders, next_cursor)"""
+    qs = (
+        Order.objects.filter(user=user)
+        .order_by("-created_at", "-id")
+        .prefetch_related("items")
+    )
+    if cursor:
+        created_at, pk = _decode_cursor(cursor)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    orders = list(qs[:limit + 1])  # 하나 더 읽어서 다음 페이지 유무 판단 (COUNT 쿼리 없음)
+    has_next = len(orders) > limit
+    orders = orders[:limit]
+    return orders, (_encode_cursor(orders[-1]) if has_next else None)
+
+def _order_dicts(orders) -> list[dict]:
+    # 페이지 전체 상품을 한 번에 카탈로그 조회 (캐시 미스분만 DB)
+    products = catalog.get_by_ids({it.product_id for o in orders for it in o.items.all()})
+    return [{
+        "id": str(o.id),
+        "total": str(o.total_amount),
+        "created_at": o.created_at.isoformat(),
+        "items": [{"sku": products[it.product_id].sku, "qty": it.quantity, "price": str(it.unit_price)}
+                  for it in o.items.all()],
+    } for o in orders]
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def list_orders_view(request):
+    try:
+        limit = min(int(request.query_params.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE)
+        orders, next_cursor = _order_page(request.user, request.query_params.get("cursor"), max(limit, 1))
+    except ValueError:
+        return Response({"detail": "Invalid cursor or limit."}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"results": _order_dicts(orders), "next": next_cursor})
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_orders_view(request):
+    """전체 주문 내보내기: keyset 청크 단위로 조회하며 JSON 배열을 스트리밍 (메모리/타임아웃 상한 없음)"""
+    user = request.user
+
+    def stream():
+        yield '{"results": ['
+        cursor, first = None, True
+        while True:
+            orders, cursor = _order_page(user, cursor, EXPORT_CHUNK)
+            for d in _order_dicts(orders):
+                yield ("" if first else ",") + json.dumps(d)
+                first = False
+            if cursor is None:
+                break
+        yield "]}"
+
+    resp = StreamingHttpResponse(stream(), content_type="application/json")
+    resp["Content-Disposition"] = 'attachment; filename="orders.json"'
+    return resp
@@ -1,6 +1,8 @@
 import uuid
 from decimal import Decimal
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 
 class Product(models.Model):
     sku = models.CharField(max_length=50, unique=True)
@@ -11,7 +13,8 @@ class Order(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey("users.User", on_delete=models.PROTECT)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
-    status = models.CharField(max_length=20, default="pending")  # pending/paid/canceled
+    status = models.CharField(max_length=20, default="pending")  # pending/processing/processed/paid/canceled
+    claimed_at = models.DateTimeField(null=True, blank=True)  # 작업 큐 선점 시각 (tx_queue.WorkQueue)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -37,4 +40,27 @@ class OutboxEvent(models.Model):
     payload = models.JSONField()
     status = models.CharField(max_length=20, default="pending")  # pending/sending/sent/failed
     attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # 재시도 backoff: 이 시각 이후에만 선점
+    last_error = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # 부분 인덱스: 디스패처가 보는 pending 행만 인덱싱 → sent가 쌓여도 크기 일정
+            models.Index(fields=["created_at"], name="outbox_pending_idx", condition=Q(status="pending")),
+            # 컴팩션 대상(sent) 스캔용
+            models.Index(fields=["sent_at"], name="outbox_sent_idx", condition=Q(status="sent")),
+        ]
+
+class OutboxEventArchive(models.Model):
+    """전송 완료 후 보존기간이 지난 아웃박스 이벤트 보관용 (핫 테이블에서 분리)"""
+    id = models.UUIDField(primary_key=True, editable=False)
+    aggregate_type = models.CharField(max_length=50)
+    aggregate_id = models.CharField(max_length=64)
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True, db_index=True)
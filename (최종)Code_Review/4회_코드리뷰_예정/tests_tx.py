@@ -1,4 +1,5 @@
 import pytest
+from datetime import timedelta
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from .models import Product, Order
@@ -22,3 +23,155 @@ def test_partial_rollback_with_savepoint():
 
     ok = charge_and_log(order=order, amount=order.total_amount)
     assert ok in (True, False)  # 데모용 — 저장지점 흐름 확인
+
+def test_outbox_dispatch_marks_sent():
+    from .models import OutboxEvent
+    from .tx_outbox import InMemoryBroker, dispatch_batch
+
+    OutboxEvent.objects.create(aggregate_type='Order', aggregate_id='1', event_type='OrderCreated', payload={'order_id': '1'})
+    broker = InMemoryBroker()
+
+    assert dispatch_batch(broker) == 1
+    assert len(broker.messages) == 1
+    assert OutboxEvent.objects.get().status == 'sent'
+    assert dispatch_batch(broker) == 0  # 재발행 없음
+
+def test_outbox_dispatch_backs_off_on_failure():
+    from .models import OutboxEvent
+    from .tx_outbox import Broker, dispatch_batch
+
+    class FailingBroker(Broker):
+        def publish(self, *, topic, key, payload):
+            raise ConnectionError('broker down')
+
+    OutboxEvent.objects.create(aggregate_type='Order', aggregate_id='1', event_type='OrderCreated', payload={})
+
+    assert dispatch_batch(FailingBroker()) == 1
+    ev = OutboxEvent.objects.get()
+    assert (ev.status, ev.attempts) == ('pending', 1)
+    assert dispatch_batch(FailingBroker()) == 0  # backoff 동안은 선점 안 됨
+
+def test_compact_outbox_moves_old_sent_events():
+    from datetime import timedelta
+    from django.utils import timezone
+    from .models import OutboxEvent, OutboxEventArchive
+    from .tx_outbox import compact_outbox
+
+    old = timezone.now() - timedelta(days=30)
+    OutboxEvent.objects.create(aggregate_type='Order', aggregate_id='1', event_type='OrderCreated', payload={}, status='sent', sent_at=old)
+    OutboxEvent.objects.create(aggregate_type='Order', aggregate_id='2', event_type='OrderCreated', payload={})  # pending 유지
+
+    assert compact_outbox(batch_size=1) == 1
+    assert OutboxEvent.objects.get().status == 'pending'
+    assert OutboxEventArchive.objects.count() == 1
+
+def test_retry_policy_stops_when_budget_exhausted():
+    from django.db import OperationalError
+    from .tx_retry import RetryBudget, RetryPolicy
+
+    calls = []
+    def deadlock():
+        calls.append(1)
+        raise OperationalError('deadlock detected')
+
+    policy = RetryPolicy(max_attempts=5, base=0, cap=0, budget=RetryBudget(max_tokens=1))
+    with pytest.raises(OperationalError):
+        policy.run(deadlock)
+
+    assert len(calls) == 2  # 토큰 1개 → 재시도 1회만
+    assert policy.metrics()['budget_denied'] == 1
+    assert policy.metrics()['errcode.40P01'] == 2
+
+def _order_queue_items(n=1, **queue_kwargs):
+    from django.db import connection
+    from .tx_queue import WorkQueue
+
+    if connection.vendor != 'postgresql':
+        pytest.skip('FOR UPDATE SKIP LOCKED / RETURNING: PostgreSQL 전용')
+    user = get_user_model().objects.create_user('u@test.com', 'pw')
+    for _ in range(n):
+        Order.objects.create(user=user, total_amount=Decimal('1.00'))
+    return WorkQueue(Order, done='processed', **queue_kwargs)
+
+def test_work_queue_claim_and_ack():
+    queue = _order_queue_items(2)
+
+    batch = queue.claim(10)
+    assert len(batch.items) == 2
+    assert set(Order.objects.values_list('status', flat=True)) == {'processing'}
+    assert queue.claim(10).items == []  # 선점된 행은 다시 안 나옴
+
+    assert queue.ack(batch) == 2
+    assert set(Order.objects.values_list('status', 'claimed_at')) == {('processed', None)}
+
+def test_work_queue_stale_claim_cannot_ack_after_reclaim():
+    import time
+    queue = _order_queue_items(1, visibility_timeout=0)
+
+    stale = queue.claim()
+    time.sleep(0.01)
+    fresh = queue.claim()  # 타임아웃 → 다른 워커가 다시 선점
+    assert [o.pk for o in fresh.items] == [o.pk for o in stale.items]
+
+    assert queue.ack(stale) == 0  # claimed_at 토큰 불일치 → 건드리지 않음
+    assert queue.nack(stale) == 0
+    assert queue.ack(fresh) == 1
+
+def test_work_queue_nack_returns_items_to_pending():
+    queue = _order_queue_items(1)
+
+    batch = queue.claim()
+    assert queue.nack(batch) == 1
+    assert Order.objects.get().status == 'pending'
+    assert len(queue.claim().items) == 1  # 즉시 재선점 가능
+
+def test_pick_next_batch_acked_orders_are_not_reclaimed(monkeypatch):
+    from .tx_concurrency import order_queue, pick_next_batch
+
+    _order_queue_items(1)
+    batch = pick_next_batch()
+    assert len(batch.items) == 1
+    assert order_queue.ack(batch) == 1
+
+    monkeypatch.setattr(order_queue, 'visibility_timeout', timedelta(0))  # 타임아웃이 지난 상황
+    assert pick_next_batch().items == []
+    assert Order.objects.get().status == 'processed'
+
+def test_stock_batcher_applies_requests_in_arrival_order():
+    from .tx_concurrency import StockBatcher
+
+    Product.objects.create(sku='A', price=Decimal('1.00'), stock=5)
+    batcher = StockBatcher(window=0.05)
+    futures = [batcher.submit('A', qty) for qty in (3, 3, 2)]  # 한 배치로 모임
+
+    assert [f.result(5) for f in futures] == [True, False, True]
+    assert Product.objects.get(sku='A').stock == 0
+
+def test_reserve_stock_hybrid_falls_back_to_batcher_when_row_locked():
+    import threading
+    from django.db import connection, transaction
+    from .tx_concurrency import LOCKED, _try_reserve_nowait, reserve_stock_hybrid
+
+    if connection.vendor != 'postgresql':
+        pytest.skip('NOWAIT 잠금 실패(55P03): PostgreSQL 전용')
+    Product.objects.create(sku='A', price=Decimal('1.00'), stock=5)
+    held, release = threading.Event(), threading.Event()
+
+    def hold_row_lock():
+        try:
+            with transaction.atomic():
+                Product.objects.select_for_update().get(sku='A')
+                held.set()
+                release.wait(5)
+        finally:
+            connection.close()
+
+    holder = threading.Thread(target=hold_row_lock)
+    holder.start()
+    held.wait(5)
+    assert _try_reserve_nowait(sku='A', qty=1) is LOCKED
+
+    threading.Timer(0.1, release.set).start()  # 잠금이 풀리면 배처가 적용
+    assert reserve_stock_hybrid(sku='A', qty=2, timeout=5) is True
+    holder.join()
+    assert Product.objects.get(sku='A').stock == 3
@@ -1,33 +1,57 @@
+from collections import defaultdict
 from decimal import Decimal
-from django.db import transaction, IntegrityError
-from django.db.models import F
+from django.db import connection, transaction, IntegrityError
 from .models import Product, Order, OrderItem, Ledger
 
+def reserve_stock(qty_by_pk: dict[int, int]) -> list[int]:
+    """
+    여러 상품 재고를 문장 하나로 차감하고, 재고가 모자라 갱신되지 않은 pk 목록을 반환 (PostgreSQL)
+    MATERIALIZED CTE에서 pk 순서로 FOR UPDATE → UPDATE ... FROM (VALUES ...) WHERE stock >= qty
+    잠금 순서를 pk로 고정해야 [A,B] / [B,A] 동시 주문이 교착되지 않음 (조인 순서에 맡기면 보장 안 됨)
+    (3회_주문API/services.reserve_stock과 같은 SQL — 폴더별 독립 예제라 의도적으로 복사, 고치면 둘 다)
+    """
+    if not qty_by_pk:
+        return []
+    table = connection.ops.quote_name(Product._meta.db_table)
+    values = ", ".join(["(%s, %s)"] * len(qty_by_pk))
+    params = [x for pk in sorted(qty_by_pk) for x in (pk, qty_by_pk[pk])]
+    with connection.cursor() as cur:
+        cur.execute(
+            f"WITH v(id, qty) AS (VALUES {values}), "
+            f"locked AS MATERIALIZED ("
+            f"SELECT p.id FROM {table} AS p JOIN v ON p.id = v.id ORDER BY p.id FOR UPDATE OF p) "
+            f"UPDATE {table} AS p SET stock = p.stock - v.qty "
+            f"FROM v JOIN locked USING (id) "
+            f"WHERE p.id = v.id AND p.stock >= v.qty RETURNING p.id",
+            params,
+        )
+        reserved = {row[0] for row in cur.fetchall()}
+    return [pk for pk in qty_by_pk if pk not in reserved]
+
 # 1) 기본: atomic 블록 하나로 '모두 성공/모두 실패'
 @transaction.atomic
 def create_order(*, user, items: list[dict]) -> Order:
     """items = [{'sku': 'A', 'qty': 2}, ...]"""
-    # 필요한 상품을 한 번에 잠그고(select_for_update) 가져오기 → 동시성/초과판매 방지
+    # 조회는 잠금 없이, 재고 차감은 조건부 UPDATE 한 번 → 초과판매 방지 + 락 대기 없음
     skus = [i['sku'] for i in items]
-    products = {p.sku: p for p in Product.objects.select_for_update().filter(sku__in=skus)}
-
-    order = Order.objects.create(user=user, total_amount=Decimal('0.00'), status='pending')
-    total = Decimal('0.00')
-    bulk_items = []
+    products = {p.sku: p for p in Product.objects.filter(sku__in=skus)}
 
+    qty_by_pk = defaultdict(int)
     for it in items:
-        p = products[it['sku']]
-        q = int(it['qty'])
-        if p.stock < q:
-            raise ValueError(f"Out of stock: {p.sku}")
-        # F-표현식 → 원자적 차감
-        Product.objects.filter(pk=p.pk).update(stock=F('stock') - q)
-        bulk_items.append(OrderItem(order=order, product=p, quantity=q, unit_price=p.price))
-        total += p.price * q
+        qty_by_pk[products[it['sku']].pk] += int(it['qty'])
+
+    short = reserve_stock(qty_by_pk)
+    if short:
+        sku = next(p.sku for p in products.values() if p.pk == short[0])
+        raise ValueError(f"Out of stock: {sku}")  # atomic → 전체 롤백
 
-    OrderItem.objects.bulk_create(bulk_items)
-    order.total_amount = total
-    order.save(update_fields=['total_amount'])
+    # 합계를 먼저 계산 → 주문은 INSERT 한 번으로 끝 (INSERT 후 total UPDATE 없음)
+    lines = [(products[it['sku']], int(it['qty'])) for it in items]
+    total = sum((p.price * q for p, q in lines), Decimal('0.00'))
+    order = Order.objects.create(user=user, total_amount=total, status='pending')
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=p, quantity=q, unit_price=p.price) for p, q in lines
+    ])
 
     # 커밋 이후 후처리(웹훅/브로커 발행 등)는 on_commit에 넣기
     transaction.on_commit(lambda: emit_order_created(order))
@@ -1,32 +1,147 @@
-from django.db import transaction, DatabaseError
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from django.db import connection, transaction, DatabaseError
 from django.db.models import F
 from .models import Product, Order
+from .tx_queue import WorkQueue
+
+LOCKED = None  # _try_reserve_nowait: 잠금 경합 (재고 부족 False와 구분)
+LOCK_NOT_AVAILABLE = '55P03'  # PostgreSQL: SELECT ... FOR UPDATE NOWAIT 실패
+
+def _is_lock_not_available(exc: DatabaseError) -> bool:
+    cause = exc.__cause__  # psycopg2: pgcode / psycopg3: sqlstate
+    return LOCK_NOT_AVAILABLE in (getattr(cause, 'pgcode', None), getattr(cause, 'sqlstate', None))
 
 # 1) nowait 잠금: 이미 잠겨 있으면 즉시 실패
 @transaction.atomic
-def reserve_stock_nowait(*, sku: str, qty: int) -> bool:
+def _try_reserve_nowait(*, sku: str, qty: int):
     try:
-        p = Product.objects.select_for_update(nowait=True).get(sku=sku)
-    except DatabaseError:
-        return False
+        # 실패한 SELECT는 안쪽 저장지점만 롤백 → 바깥 atomic 안에서 불려도 트랜잭션이 깨지지 않음
+        with transaction.atomic():
+            p = Product.objects.select_for_update(nowait=True).get(sku=sku)
+    except DatabaseError as e:
+        if not _is_lock_not_available(e):
+            raise  # 연결 끊김/제약 위반 등은 경합이 아님
+        return LOCKED
     if p.stock < qty:
         return False
     Product.objects.filter(pk=p.pk).update(stock=F('stock') - qty)
     return True
 
+def reserve_stock_nowait(*, sku: str, qty: int) -> bool:
+    return bool(_try_reserve_nowait(sku=sku, qty=qty))
+
+
+class StockBatcher:
+    """
+    SKU별 인프로세스 배처: 잠금 경합으로 밀린 예약을 모아 행 잠금 1번 + UPDATE 1번으로 적용
+    요청마다 Future를 돌려주고, 배치가 커밋된 뒤 True(예약됨)/False(재고 부족)로 완료
+    """
+    def __init__(self, window=0.005):
+        self.window = window  # 첫 요청 후 이만큼 더 모았다가 적용 (초)
+        self._lock = threading.Lock()
+        self._pending = defaultdict(list)  # sku -> [(qty, Future)]
+        self._active = set()               # 플러시 스레드가 돌고 있는 sku
+
+    def submit(self, sku: str, qty: int) -> Future:
+        fut = Future()
+        with self._lock:
+            self._pending[sku].append((qty, fut))
+            start = sku not in self._active
+            self._active.add(sku)
+        if start:
+            threading.Thread(target=self._drain, args=(sku,), name=f'stock-batcher-{sku}', daemon=True).start()
+        return fut
+
+    def _drain(self, sku):
+        try:
+            time.sleep(self.window)
+            while True:
+                with self._lock:
+                    reqs = self._pending.pop(sku, [])
+                    if not reqs:
+                        self._active.discard(sku)
+                        return
+                # 호출자가 타임아웃으로 취소한 요청은 제외
+                self._apply(sku, [(q, f) for q, f in reqs if f.set_running_or_notify_cancel()])
+        finally:
+            # 배치마다 새 스레드 → CONN_MAX_AGE가 있어도 이 스레드 커넥션은 재사용되지 않으므로 직접 닫음
+            connection.close()
+
+    def _apply(self, sku, reqs):
+        if not reqs:
+            return
+        results = []
+        try:
+            with transaction.atomic():
+                # 배치 전체가 잠금을 한 번만 기다림 (요청 수만큼 줄 서지 않음)
+                p = Product.objects.select_for_update().get(sku=sku)
+                remaining = p.stock
+                for qty, fut in reqs:  # 도착 순서대로 가능한 만큼 채택
+                    ok = qty <= remaining
+                    if ok:
+                        remaining -= qty
+                    results.append((fut, ok))
+                if remaining != p.stock:
+                    Product.objects.filter(pk=p.pk).update(stock=F('stock') - (p.stock - remaining))
+        except Exception as e:
+            for _, fut in reqs:
+                fut.set_exception(e)
+            return
+        for fut, ok in results:  # 커밋 이후에 결과 통지
+            fut.set_result(ok)
+
+stock_batcher = StockBatcher()
+
+def reserve_stock_hybrid(*, sku: str, qty: int, timeout: float = 2.0) -> bool:
+    """
+    하이브리드 예약: nowait로 먼저 시도하고, 잠겨 있으면 배처에 맡겨 결과를 기다림
+    예약은 자체 트랜잭션으로 커밋됨 → 바깥 atomic 안에서 호출하지 말 것
+    """
+    got = _try_reserve_nowait(sku=sku, qty=qty)
+    if got is not LOCKED:
+        return got
+    fut = stock_batcher.submit(sku, qty)
+    try:
+        return fut.result(timeout)
+    except FutureTimeout:
+        if fut.cancel():  # 아직 배치에 안 들어감 → 예약 안 된 것으로 확정
+            return False
+        return fut.result()  # 이미 적용 중 → 결과는 곧 나옴
+
 # 2) 데드락 예방: 항상 같은 순서로 자원 잠그기
+def lock_in_order(*querysets):
+    """
+    여러 모델의 행을 전역 고정 순서(테이블 이름 → pk)로 잠금. 반드시 atomic 안에서 호출
+    모델마다 SELECT ... ORDER BY pk FOR UPDATE 한 번 → 호출부가 어떤 순서로 넘기든 잠금 순서는 같음
+    같은 모델은 한 번만 넘길 것 (pk__in 등으로 합쳐서)
+    반환: 인자 순서대로 잠긴 객체 리스트
+    """
+    tables = [qs.model._meta.db_table for qs in querysets]
+    if len(set(tables)) != len(tables):
+        raise ValueError('lock_in_order: 같은 모델은 queryset 하나로 합쳐서 넘길 것')
+    locked = [None] * len(querysets)
+    for i in sorted(range(len(querysets)), key=tables.__getitem__):
+        locked[i] = list(querysets[i].select_for_update().order_by('pk'))
+    return locked
+
 @transaction.atomic
 def swap_two_products(p1_id: int, p2_id: int):
-    a, b = sorted([p1_id, p2_id])  # 잠금 순서 고정
-    pa = Product.objects.select_for_update().get(pk=a)
-    pb = Product.objects.select_for_update().get(pk=b)
+    (products,) = lock_in_order(Product.objects.filter(pk__in=[p1_id, p2_id]))
+    by_pk = {p.pk: p for p in products}
+    pa, pb = by_pk[p1_id], by_pk[p2_id]
     # ... 상태 변경 로직
 
-# 3) (PostgreSQL) skip_locked 스타일 배치 선점
+# 3) (PostgreSQL) skip_locked 스타일 배치 선점 → tx_queue.WorkQueue로 일반화
+# UPDATE ... RETURNING 한 문장으로 선점 (행마다 save() 없음), 워커가 죽으면 5분 뒤 재선점
+order_queue = WorkQueue(Order, done='processed', visibility_timeout=300)
+
 def pick_next_batch(limit=100):
-    with transaction.atomic():
-        rows = (Order.objects.select_for_update(skip_locked=True).filter(status='pending').order_by('created_at')[:limit])
-        for o in rows:
-            o.status = 'processing'
-            o.save(update_fields=['status'])
-        return list(rows)
+    """
+    선점한 Batch를 그대로 반환 (batch.items + claimed_at 토큰)
+    처리 후 order_queue.ack(batch) / 실패 시 order_queue.nack(batch) 필수 —
+    ack하지 않으면 visibility_timeout 뒤 다른 워커가 다시 선점해 중복 처리됨
+    """
+    return order_queue.claim(limit)
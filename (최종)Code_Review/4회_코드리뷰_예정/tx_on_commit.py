@@ -1,5 +1,9 @@
+import logging
 from django.db import transaction
 from .models import OutboxEvent, Order
+from .tx_outbox import get_wakeup
+
+logger = logging.getLogger(__name__)
 
 def create_outbox_for_order_created(order: Order):
     # 1) 트랜잭션 안에서 Outbox 레코드 생성
@@ -14,5 +18,9 @@ def create_outbox_for_order_created(order: Order):
     transaction.on_commit(lambda: schedule_outbox_dispatch())
 
 def schedule_outbox_dispatch():
-    # TODO: Celery/커맨드에서 OutboxEvent를 읽어 전송
-    pass
+    # 대기 중인 디스패처(tx_outbox.run_dispatcher)를 즉시 깨움
+    # 실패해도 디스패처의 fallback 폴링이 처리하므로 요청은 실패시키지 않음
+    try:
+        get_wakeup().notify()
+    except Exception:
+        logger.exception("outbox wakeup failed")
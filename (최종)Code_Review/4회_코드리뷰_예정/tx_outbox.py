@@ -0,0 +1,228 @@
+import logging
+import select
+import threading
+import time
+from datetime import timedelta
+from django.db import connection, connections, transaction, close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from .models import OutboxEvent, OutboxEventArchive
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 10
+BASE_BACKOFF = 1.0    # 초
+MAX_BACKOFF = 300.0   # 초
+OUTBOX_CHANNEL = 'outbox_events'
+MIN_WAIT = 0.1        # 초, 대기 하한 (다른 워커가 잡고 있는 행 때문에 헛도는 것 방지)
+
+
+class Broker:
+    """발행 대상 인터페이스: 실패 시 예외를 던질 것"""
+    def publish(self, *, topic: str, key: str, payload: dict) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBroker(Broker):
+    """로컬/테스트용 브로커: 발행된 메시지를 리스트에 쌓기만 함"""
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, *, topic: str, key: str, payload: dict) -> None:
+        self.messages.append({'topic': topic, 'key': key, 'payload': payload})
+
+
+def _backoff_seconds(attempts: int) -> float:
+    return min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (attempts - 1))
+
+
+# 1) 배치 선점 → 발행 → 상태 반영
+def dispatch_batch(broker: Broker, *, limit: int = 100) -> int:
+    """처리한 이벤트 수를 반환 (0이면 보낼 게 없음)"""
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked: 다른 워커가 잡은 행은 건너뜀 → 워커를 늘려도 중복 발행 없음
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('created_at')[:limit]
+        )
+        if not events:
+            return 0
+
+        sent, failed = [], []
+        for ev in events:
+            try:
+                broker.publish(topic=ev.event_type, key=ev.aggregate_id, payload=ev.payload)
+            except Exception as e:
+                failed.append((ev, e))
+            else:
+                sent.append(ev.pk)
+
+        # 성공분은 UPDATE 한 번으로 처리
+        if sent:
+            OutboxEvent.objects.filter(pk__in=sent).update(
+                status='sent', sent_at=now, attempts=F('attempts') + 1,
+            )
+        # 실패분은 attempts 기반 지수 backoff 후 재시도, 한도 초과 시 failed
+        for ev, e in failed:
+            attempts = ev.attempts + 1
+            OutboxEvent.objects.filter(pk=ev.pk).update(
+                attempts=attempts,
+                status='failed' if attempts >= MAX_ATTEMPTS else 'pending',
+                available_at=now + timedelta(seconds=_backoff_seconds(attempts)),
+                last_error=str(e)[:1000],
+            )
+            logger.warning("outbox publish failed: id=%s attempts=%s error=%s", ev.pk, attempts, e)
+
+    # 커밋 직전 워커가 죽으면 재발행될 수 있음 → at-least-once, 소비자는 id로 중복 제거
+    return len(events)
+
+
+# 2) 깨우기 신호: 커밋 직후 디스패처를 즉시 깨움 (폴링 지연 제거)
+class LocalWakeup:
+    """웹과 디스패처가 같은 프로세스일 때: threading.Event"""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def notify(self) -> None:
+        self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        fired = self._event.wait(timeout)
+        self._event.clear()
+        return fired
+
+
+class PgWakeup:
+    """PostgreSQL LISTEN/NOTIFY: 디스패처는 전용 커넥션에서 LISTEN 후 select()로 블로킹"""
+    def __init__(self, channel: str = OUTBOX_CHANNEL):
+        self.channel = channel
+        self._conn = None
+        self._error_backoff = BASE_BACKOFF
+
+    def notify(self) -> None:
+        with connection.cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, '')", [self.channel])
+
+    def _listen_conn(self):
+        if self._conn is None or self._conn.closed:
+            import psycopg2
+            conn = psycopg2.connect(**connections['default'].get_connection_params())
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN "{self.channel}"')
+            self._conn = conn
+        return self._conn
+
+    def wait(self, timeout: float) -> bool:
+        try:
+            conn = self._listen_conn()
+            if not select.select([conn], [], [], timeout)[0]:
+                return False  # 타임아웃 → 폴링 한 번
+            conn.poll()
+            fired = bool(conn.notifies)
+            conn.notifies.clear()  # 여러 건이 와도 배치 한 번이면 충분
+            self._error_backoff = BASE_BACKOFF
+            return fired
+        except Exception:
+            # DB 재시작 등으로 LISTEN 연결 실패 → 바로 돌아가면 디스패처가 쉬지 않고 DB/로그를 두드림
+            # timeout 안에서 지수 backoff 만큼 쉬고 폴링 한 번으로 대체
+            logger.exception("outbox LISTEN connection error, retry in %.1fs", min(timeout, self._error_backoff))
+            self._conn = None
+            time.sleep(min(timeout, self._error_backoff))
+            self._error_backoff = min(MAX_BACKOFF, self._error_backoff * 2)
+            return False
+
+
+_wakeup = None
+
+def get_wakeup():
+    """DB 종류에 맞는 깨우기 채널 (프로세스당 1개)"""
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = PgWakeup() if connection.vendor == 'postgresql' else LocalWakeup()
+    return _wakeup
+
+
+# 3) 장기 실행 워커 (management command / 별도 프로세스에서 실행)
+def run_dispatcher(broker: Broker, *, batch_size: int = 100, fallback_poll: float = 30.0,
+                   wakeup=None, stop=None):
+    """
+    stop(threading.Event)이 set 될 때까지 반복.
+    보낼 게 없으면 깨우기 신호가 올 때까지 블로킹, 놓친 신호 대비로 fallback_poll 초마다 폴링
+    (즉시 종료하려면 stop.set() 후 wakeup.notify())
+    """
+    wakeup = wakeup or get_wakeup()
+    while not (stop and stop.is_set()):
+        close_old_connections()  # 장기 실행 프로세스에서 끊긴 커넥션 정리
+        try:
+            n = dispatch_batch(broker, limit=batch_size)
+        except Exception:
+            logger.exception("outbox dispatch error")
+            n = 0
+        # 배치를 꽉 채웠으면 바로 다음 배치, 아니면 신호 대기
+        # backoff 중인 이벤트(available_at)는 깨워주는 신호가 없으므로 그 시각까지만 대기
+        if n < batch_size:
+            wakeup.wait(_wait_seconds(fallback_poll))
+
+
+def _wait_seconds(fallback_poll: float) -> float:
+    """min(fallback_poll, 다음 재시도 시각까지 남은 시간), 하한 MIN_WAIT"""
+    try:
+        next_at = (
+            OutboxEvent.objects.filter(status='pending')
+            .order_by('available_at').values_list('available_at', flat=True).first()
+        )
+    except Exception:
+        logger.exception("outbox next available_at lookup failed")
+        return fallback_poll
+    if next_at is None:
+        return fallback_poll
+    return max(MIN_WAIT, min(fallback_poll, (next_at - timezone.now()).total_seconds()))
+
+
+# 4) 보존 정책: 오래된 sent 이벤트를 아카이브로 옮기고 핫 테이블에서 삭제
+ARCHIVE_FIELDS = ('id', 'aggregate_type', 'aggregate_id', 'event_type', 'payload',
+                  'attempts', 'created_at', 'sent_at')
+
+def compact_outbox(*, older_than: timedelta = timedelta(days=7), batch_size: int = 1000,
+                   max_batches: int | None = None, archive: bool = True) -> int:
+    """
+    배치 하나 = 짧은 트랜잭션 하나 (긴 잠금/거대한 DELETE 방지).
+    주기 작업(Celery beat/cron)에서 max_batches로 1회 작업량을 제한해서 실행
+    """
+    cutoff = timezone.now() - older_than
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(status='sent', sent_at__lt=cutoff)
+                .order_by('sent_at')[:batch_size]
+            )
+            if not rows:
+                break
+            if archive:
+                OutboxEventArchive.objects.bulk_create(
+                    [OutboxEventArchive(**{f: getattr(ev, f) for f in ARCHIVE_FIELDS}) for ev in rows],
+                    ignore_conflicts=True,  # 재실행 시 이미 옮긴 행은 무시
+                )
+            OutboxEvent.objects.filter(pk__in=[ev.pk for ev in rows]).delete()
+        moved += len(rows)
+        batches += 1
+    logger.info("outbox compacted: moved=%s batches=%s", moved, batches)
+    return moved
+
+def purge_outbox_archive(*, older_than: timedelta = timedelta(days=90), batch_size: int = 5000) -> int:
+    """아카이브도 보존기간이 지나면 배치 단위로 삭제"""
+    cutoff = timezone.now() - older_than
+    deleted = 0
+    while True:
+        ids = list(
+            OutboxEventArchive.objects.filter(archived_at__lt=cutoff)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += OutboxEventArchive.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,97 @@
+import logging
+import threading
+from datetime import timedelta
+from typing import NamedTuple
+from django.db import connection, close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class Batch(NamedTuple):
+    items: list
+    claimed_at: object  # 선점 토큰: ack/nack 시 이 값이 그대로인 행만 갱신
+
+
+class WorkQueue:
+    """
+    DB 테이블 기반 작업 큐 (PostgreSQL)
+
+    대상 모델에 status / claimed_at(DateTimeField, null) 컬럼만 있으면 됨
+    - claim: UPDATE ... WHERE pk IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING * 한 문장으로 선점
+    - visibility_timeout: 선점 후 이 시간 안에 ack/nack이 없으면(워커 사망) 다시 선점 대상
+    - ack/nack: 배치 단위 UPDATE 한 번. 타임아웃으로 다른 워커에게 넘어간 행은 claimed_at이 달라 건드리지 않음
+    """
+    def __init__(self, model, *, status_field='status', claimed_field='claimed_at', order_by='created_at',
+                 pending='pending', processing='processing', done='done', visibility_timeout=300):
+        self.model = model
+        self.status_field = status_field
+        self.claimed_field = claimed_field
+        self.order_by = order_by
+        self.pending, self.processing, self.done = pending, processing, done
+        self.visibility_timeout = timedelta(seconds=visibility_timeout)
+
+    def _col(self, name):
+        return connection.ops.quote_name(self.model._meta.get_field(name).column)
+
+    def claim(self, limit=100) -> Batch:
+        now = timezone.now()
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        pk, status, claimed = self._col(self.model._meta.pk.name), self._col(self.status_field), self._col(self.claimed_field)
+        sql = (
+            f"UPDATE {table} SET {status} = %s, {claimed} = %s "
+            f"WHERE {pk} IN ("
+            f"  SELECT {pk} FROM {table}"
+            f"  WHERE {status} = %s OR ({status} = %s AND {claimed} < %s)"
+            f"  ORDER BY {self._col(self.order_by)} LIMIT %s"
+            f"  FOR UPDATE SKIP LOCKED"
+            f") RETURNING *"
+        )
+        params = [self.processing, now, self.pending, self.processing, now - self.visibility_timeout, limit]
+        # 단일 문장 → autocommit에서도 원자적. 선점 결과는 커밋 즉시 다른 워커에게 보임
+        items = list(self.model.objects.raw(sql, params))
+        items.sort(key=lambda o: getattr(o, self.order_by))  # RETURNING은 순서 보장 없음
+        return Batch(items, now)
+
+    def _claimed(self, batch: Batch, items=None):
+        pks = [o.pk for o in (batch.items if items is None else items)]
+        return self.model.objects.filter(**{
+            'pk__in': pks, self.status_field: self.processing, self.claimed_field: batch.claimed_at,
+        })
+
+    def ack(self, batch: Batch, items=None) -> int:
+        """처리 완료 (items 생략 시 배치 전체)"""
+        return self._claimed(batch, items).update(**{self.status_field: self.done, self.claimed_field: None})
+
+    def nack(self, batch: Batch, items=None) -> int:
+        """즉시 재처리 대상으로 되돌림"""
+        return self._claimed(batch, items).update(**{self.status_field: self.pending, self.claimed_field: None})
+
+
+def run_workers(queue: WorkQueue, handler, *, workers=4, batch_size=100, idle_sleep=1.0, stop=None):
+    """
+    워커 스레드 풀: 스레드마다 claim → handler(items) → ack, 예외 시 nack
+    handler는 idempotent하게 작성할 것 (ack 직전 사망 시 타임아웃 후 재처리 → at-least-once)
+    """
+    stop = stop or threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            close_old_connections()  # 스레드별 커넥션: 끊긴 연결 정리
+            batch = queue.claim(batch_size)
+            if not batch.items:
+                stop.wait(idle_sleep)
+                continue
+            try:
+                handler(batch.items)
+            except Exception:
+                logger.exception("work queue batch failed: model=%s size=%s", queue.model.__name__, len(batch.items))
+                queue.nack(batch)
+            else:
+                queue.ack(batch)
+        close_old_connections()
+
+    threads = [threading.Thread(target=loop, name=f'workqueue-{i}', daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    return stop, threads
@@ -1,36 +1,120 @@
+import logging
+import random
+import threading
 import time
+from collections import Counter
 from functools import wraps
 from django.db import transaction
 
+logger = logging.getLogger(__name__)
+
 # PostgreSQL 예: 직렬화 실패/데드락 에러코드
 PG_RETRY_ERRCODES = {'40001', '40P01'}
+_RETRY_MESSAGES = {'deadlock detected': '40P01', 'could not serialize access': '40001'}
 
 def _pgcode_from(exc: Exception):
     return getattr(exc, 'pgcode', None) or getattr(getattr(exc, '__cause__', None), 'pgcode', None)
 
-def is_retryable(exc: Exception) -> bool:
+def classify(exc: Exception):
+    """재시도 가능한 에러면 에러코드(메트릭 라벨), 아니면 None"""
     code = _pgcode_from(exc)
-    if code and code in PG_RETRY_ERRCODES:
-        return True
+    if code:
+        return code if code in PG_RETRY_ERRCODES else None
     msg = str(exc).lower()
-    return any(k in msg for k in ('deadlock detected', 'could not serialize access'))
+    return next((c for k, c in _RETRY_MESSAGES.items() if k in msg), None)
+
+def is_retryable(exc: Exception) -> bool:
+    return classify(exc) is not None
+
+
+class RetryBudget:
+    """
+    프로세스 단위 재시도 예산 (토큰 버킷)
+    성공 1회마다 ratio 토큰 적립, 재시도 1회마다 1 토큰 소모
+    → 장애 중 재시도 비율이 성공의 ratio배를 넘지 못함 (재시도 폭주 방지)
+    """
+    def __init__(self, ratio=0.2, max_tokens=20.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
 
-def retry_on_tx_failure(max_attempts=3, backoff=0.05):
-    """idempotent 구간에만 적용할 것!"""
-    def deco(fn):
+DEFAULT_BUDGET = RetryBudget()
+
+
+class RetryPolicy:
+    """
+    트랜잭션 재시도 정책: decorrelated jitter + 재시도 예산 + 에러코드별 카운터
+    sleep = min(cap, uniform(base, 직전 sleep * 3)) → 충돌한 트랜잭션들이 같은 박자로 다시 부딪히지 않음
+    fn은 atomic 블록 전체여야 함 (실패한 트랜잭션 안에서 재시도하면 PostgreSQL은 계속 에러)
+    idempotent 구간에만 적용할 것!
+    """
+    def __init__(self, max_attempts=3, base=0.05, cap=1.0, budget=None, name='default'):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.budget = budget or DEFAULT_BUDGET
+        self.name = name
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def metrics(self) -> dict:
+        """ex) {'success': 120, 'retries': 4, 'errcode.40P01': 4, 'exhausted': 0, 'budget_denied': 0}"""
+        with self._lock:
+            return dict(self._counts)
+
+    def run(self, fn, *args, **kwargs):
+        sleep = self.base
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                code = classify(e)
+                if code is None:
+                    raise
+                self._count(f'errcode.{code}')
+                if attempt >= self.max_attempts:
+                    self._count('exhausted')
+                    raise
+                if not self.budget.withdraw():
+                    self._count('budget_denied')
+                    raise
+                self._count('retries')
+                sleep = min(self.cap, random.uniform(self.base, sleep * 3))
+                logger.warning(f"[{self.name}] retry {attempt}/{self.max_attempts} after {code}, sleep={sleep:.3f}s")
+                time.sleep(sleep)
+                continue
+            self.budget.deposit()
+            self._count('success')
+            return result
+
+    def __call__(self, fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            attempt = 0
-            while True:
-                attempt += 1
-                try:
-                    return fn(*args, **kwargs)
-                except Exception as e:
-                    if attempt >= max_attempts or not is_retryable(e):
-                        raise
-                    time.sleep(backoff * attempt)
+            return self.run(fn, *args, **kwargs)
+        wrapper.retry_policy = self  # wrapper.retry_policy.metrics()
         return wrapper
-    return deco
+
+def retry_on_tx_failure(max_attempts=3, backoff=0.05, cap=1.0):
+    """idempotent 구간에만 적용할 것! (기존 시그니처 유지, backoff = jitter 하한)"""
+    return RetryPolicy(max_attempts=max_attempts, base=backoff, cap=cap, name='retry_on_tx_failure')
 
 @retry_on_tx_failure(max_attempts=5, backoff=0.1)
 @transaction.atomic
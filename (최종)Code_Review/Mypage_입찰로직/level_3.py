@@ -1,9 +1,203 @@
-from django.db.models import F          # [추가] DB 레벨 연산을 위한 모듈
-from django.db import transaction       # [추가] 트랜잭션 관리를 위한 모듈
+import base64
+from datetime import datetime
+from django.db import models
+from django.db.models import Count, F, Q, Sum, NOT_PROVIDED  # [추가] DB 레벨 연산을 위한 모듈
+from django.db.models.functions import TruncMonth
+from django.db import connection, transaction  # [추가] 트랜잭션 관리를 위한 모듈
+from django.http import JsonResponse
+from django.utils import timezone
+
+
+# [추가] models.py
+# 거래 내역 조회용 커버링 인덱스 → Transaction.Meta.indexes 에 추가
+# (wallet, created_at, id) 순 keyset 스캔 + 목록 컬럼을 INCLUDE → 테이블 접근 없이 index-only scan (PostgreSQL)
+TRANSACTION_HISTORY_INDEX = models.Index(
+    fields=['wallet', 'created_at', 'id'],
+    include=['amount', 'transaction_type'],
+    name='tx_wallet_history_idx',
+)
+
+
+class WalletMonthlySummary(models.Model):
+    """
+    [추가] 월별/유형별 거래 합계 (거래 INSERT 때마다 증분 갱신) → 요약 화면이 전체 내역을 스캔하지 않음
+    주의: 증분 갱신은 WalletService.charge 경로에만 있음. 그 밖에서 Transaction을 쓰면
+    (관리자 보정, 데이터 이관 등) 합계가 조용히 어긋나므로 WalletService.rebuild_monthly_summary로 재계산
+    """
+    wallet = models.ForeignKey('Wallet', on_delete=models.CASCADE, related_name='monthly_summaries')
+    month = models.DateField()  # 해당 월 1일
+    transaction_type = models.CharField(max_length=20)
+    total_amount = models.BigIntegerField(default=0)
+    tx_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['wallet', 'month', 'transaction_type'],
+                name='wallet_monthly_summary_unique',
+            ),
+        ]
+
+
+class WalletService:
+    """
+    [추가] 지갑 잔액 변경 전용 서비스
+    잔액 증가 + 새 잔액 조회 + 거래 기록을 DB 왕복 1번으로 처리 (PostgreSQL)
+    → select_for_update / save(전체 컬럼) / refresh_from_db 3단계가 사라지고 행 잠금은 UPDATE 순간에만 잡힘
+    """
+
+    @staticmethod
+    def _insert_values(amount, transaction_type, description):
+        # Transaction INSERT 컬럼: create()와 같은 값이 들어가도록 모든 concrete 필드를 채움
+        # (raw SQL이라 auto_now(_add)·파이썬 default는 직접 계산, db_default는 DB에 맡김)
+        given = {'amount': amount, 'transaction_type': transaction_type, 'description': description}
+        now = timezone.now()
+        names, exprs, params = [], [], []
+        for f in Transaction._meta.concrete_fields:
+            if f.primary_key and f.db_returning:  # AutoField 계열: DB가 채움
+                continue
+            if getattr(f, 'db_default', NOT_PROVIDED) is not NOT_PROVIDED:
+                continue
+            names.append(connection.ops.quote_name(f.column))
+            if f.name == 'wallet':
+                exprs.append('w.id')  # UPDATE ... RETURNING id 값으로 채움
+                continue
+            if f.name in given:
+                value = given[f.name]
+            elif getattr(f, 'auto_now_add', False) or getattr(f, 'auto_now', False):
+                value = now
+            else:
+                value = f.get_default()
+            exprs.append('%s')
+            params.append(f.get_db_prep_save(value, connection))
+        return names, exprs, params
+
+    @staticmethod
+    def charge(user, amount, *, transaction_type='DEPOSIT', description=''):
+        """잔액 += amount 후 새 잔액 반환. 지갑이 없으면 Wallet.DoesNotExist"""
+        if connection.vendor != 'postgresql':
+            return WalletService._charge_fallback(user, amount, transaction_type, description)
+
+        wallet_table = connection.ops.quote_name(Wallet._meta.db_table)
+        tx_table = connection.ops.quote_name(Transaction._meta.db_table)
+        balance = connection.ops.quote_name(Wallet._meta.get_field('balance').column)
+        user_col = connection.ops.quote_name(Wallet._meta.get_field('user').column)
+        names, exprs, params = WalletService._insert_values(amount, transaction_type, description)
+
+        summary_table = connection.ops.quote_name(WalletMonthlySummary._meta.db_table)
+        s_wallet, s_month, s_type, s_total, s_count = (
+            connection.ops.quote_name(WalletMonthlySummary._meta.get_field(n).column)
+            for n in ('wallet', 'month', 'transaction_type', 'total_amount', 'tx_count')
+        )
+
+        # data-modifying CTE: UPDATE + 거래 INSERT + 월별 합계 UPSERT가 한 문장 → 원자적, 왕복 1번
+        sql = (
+            f"WITH w AS ("
+            f"  UPDATE {wallet_table} SET {balance} = {balance} + %s WHERE {user_col} = %s"
+            f"  RETURNING id, {balance}"
+            f"), t AS ("
+            f"  INSERT INTO {tx_table} ({', '.join(names)}) SELECT {', '.join(exprs)} FROM w"
+            f"  RETURNING 1"
+            f"), s AS ("
+            f"  INSERT INTO {summary_table} ({s_wallet}, {s_month}, {s_type}, {s_total}, {s_count})"
+            f"  SELECT id, %s, %s, %s, 1 FROM w"
+            f"  ON CONFLICT ({s_wallet}, {s_month}, {s_type}) DO UPDATE"
+            f"  SET {s_total} = {summary_table}.{s_total} + EXCLUDED.{s_total},"
+            f"      {s_count} = {summary_table}.{s_count} + 1"
+            f"  RETURNING 1"
+            f") SELECT {balance} FROM w"
+        )
+        month = timezone.localdate().replace(day=1)
+        with connection.cursor() as cur:
+            cur.execute(sql, [amount, user.pk, *params, month, transaction_type, amount])
+            row = cur.fetchone()
+        if row is None:
+            raise Wallet.DoesNotExist
+        return row[0]
+
+    @staticmethod
+    @transaction.atomic
+    def _charge_fallback(user, amount, transaction_type, description):
+        # CTE 미지원 DB: 조건 없는 F 증가(UPDATE) → 잔액 조회 → INSERT (잠금 대기 없음)
+        if not Wallet.objects.filter(user=user).update(balance=F('balance') + amount):
+            raise Wallet.DoesNotExist
+        wallet_id, new_balance = Wallet.objects.filter(user=user).values_list('id', 'balance').get()
+        Transaction.objects.create(
+            wallet_id=wallet_id,
+            amount=amount,
+            transaction_type=transaction_type,
+            description=description,
+        )
+        summary, _ = WalletMonthlySummary.objects.get_or_create(
+            wallet_id=wallet_id,
+            month=timezone.localdate().replace(day=1),
+            transaction_type=transaction_type,
+        )
+        WalletMonthlySummary.objects.filter(pk=summary.pk).update(
+            total_amount=F('total_amount') + amount,
+            tx_count=F('tx_count') + 1,
+        )
+        return new_balance
+
+    @staticmethod
+    def history(wallet_id, cursor=None, limit=50):
+        """
+        최신순 거래 내역 한 페이지 → (rows, next_cursor)
+        OFFSET 대신 (created_at, id) keyset: 몇 번째 페이지든 TRANSACTION_HISTORY_INDEX 범위 스캔 한 번
+        """
+        qs = (
+            Transaction.objects.filter(wallet_id=wallet_id)
+            .order_by('-created_at', '-id')
+            .values('id', 'amount', 'transaction_type', 'created_at')  # 커버링 인덱스 컬럼만
+        )
+        if cursor:
+            created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+            created_at = datetime.fromisoformat(created_at)
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=int(pk)))
+        rows = list(qs[:limit + 1])
+        if len(rows) <= limit:
+            return rows, None
+        last = rows[limit - 1]
+        raw = f"{last['created_at'].isoformat()}|{last['id']}"
+        return rows[:limit], base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_monthly_summary(wallet_id):
+        """
+        거래 내역으로 월별 합계를 다시 계산 (backfill / charge 밖에서 쓴 거래 반영)
+        지갑 행을 잠가 재계산 중 charge(같은 행 UPDATE)와 겹치지 않게 함 → 재계산된 행 수 반환
+        """
+        Wallet.objects.select_for_update().filter(pk=wallet_id).values_list('pk', flat=True).first()
+        rows = list(
+            Transaction.objects.filter(wallet_id=wallet_id)
+            .annotate(m=TruncMonth('created_at', output_field=models.DateField()))
+            .values('m', 'transaction_type')
+            .annotate(total=Sum('amount'), n=Count('id'))
+        )
+        WalletMonthlySummary.objects.filter(wallet_id=wallet_id).delete()
+        WalletMonthlySummary.objects.bulk_create([
+            WalletMonthlySummary(
+                wallet_id=wallet_id, month=r['m'], transaction_type=r['transaction_type'],
+                total_amount=r['total'], tx_count=r['n'],
+            )
+            for r in rows
+        ])
+        return len(rows)
+
+    @staticmethod
+    def monthly_totals(wallet_id, month=None):
+        """이번 달(또는 month) 유형별 합계: {'DEPOSIT': (합계, 건수), ...}"""
+        month = (month or timezone.localdate()).replace(day=1)
+        return {
+            r['transaction_type']: (r['total_amount'], r['tx_count'])
+            for r in WalletMonthlySummary.objects.filter(wallet_id=wallet_id, month=month)
+            .values('transaction_type', 'total_amount', 'tx_count')
+        }
+
 
 # 재화 충전 (간이 버전) _ 144_181_codeline
 @login_required
-@transaction.atomic
 def charge_wallet(request):
     if request.method == 'POST':
         try:
@@ -12,25 +206,9 @@ def charge_wallet(request):
             if amount <= 0:
                 raise ValueError("금액은 0보다 커야 합니다.")
 
-            # [수정] select_for_update() 추가: 
-            # 데이터를 가져올 때 해당 행(Row)에 잠금(Lock)을 걸어 다른 요청이 동시에 수정하지 못하게 막음
-            wallet = Wallet.objects.select_for_update().get(user=request.user)
-            
-            # [수정] F객체 사용: 
-            # 파이썬 메모리가 아닌, DB가 직접 현재 값에서 더하기를 수행하도록 지시 (동시성 문제 2차 방어)
-            wallet.balance = F('balance') + amount 
-            wallet.save()
-            
-            # [추가] DB 값 갱신: 
-            # F객체로 연산한 후에는 파이썬 변수(wallet.balance)가 실제 숫자를 모르므로, DB에서 다시 값을 불러옴
-            wallet.refresh_from_db()
-
-            Transaction.objects.create(
-                wallet=wallet,
-                amount=amount,
-                transaction_type='DEPOSIT',
-                description='마이페이지에서 충전'
-            )
+            # [수정] select_for_update + F + save + refresh_from_db (3단계) 대신
+            # UPDATE ... RETURNING 한 문장으로 증가/새 잔액 조회/거래 기록까지 처리
+            WalletService.charge(request.user, amount, description='마이페이지에서 충전')
             messages.success(request, f"{amount}원이 충전되었습니다!")
 
         except ValueError: # [추가] 값 에러(문자 입력, 음수 입력 등) 처리
@@ -38,4 +216,27 @@ def charge_wallet(request):
         except Wallet.DoesNotExist: # [추가] 지갑이 없는 경우 처리
             messages.error(request, "지갑이 없습니다.")
 
-    return redirect('mypage')
\ No newline at end of file
+    return redirect('mypage')
+
+
+# [추가] 거래 내역 API (마이페이지 무한 스크롤용)
+@login_required
+def wallet_history(request):
+    try:
+        wallet_id = Wallet.objects.filter(user=request.user).values_list('id', flat=True).get()
+        rows, next_cursor = WalletService.history(
+            wallet_id,
+            cursor=request.GET.get('cursor'),
+            limit=max(min(int(request.GET.get('limit', 50)), 200), 1),  # 0 이하면 빈 페이지 + cursor 반복
+        )
+    except Wallet.DoesNotExist:
+        return JsonResponse({'error': '지갑이 없습니다.'}, status=404)
+    except ValueError:
+        return JsonResponse({'error': '잘못된 요청입니다.'}, status=400)
+
+    deposit_total, deposit_count = WalletService.monthly_totals(wallet_id).get('DEPOSIT', (0, 0))
+    return JsonResponse({
+        'results': [{**r, 'created_at': r['created_at'].isoformat()} for r in rows],
+        'next': next_cursor,
+        'this_month_deposit': {'total': deposit_total, 'count': deposit_count},
+    })
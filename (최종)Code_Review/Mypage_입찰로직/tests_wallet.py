@@ -0,0 +1,36 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from .models import Transaction, Wallet
+from .services import WalletService
+
+pytestmark = pytest.mark.django_db
+
+@pytest.fixture
+def wallet():
+    user = get_user_model().objects.create_user('u', password='pw')
+    return Wallet.objects.create(user=user, balance=0)
+
+def test_rebuild_monthly_summary_includes_transactions_written_outside_charge(wallet):
+    WalletService.charge(wallet.user, 100)
+    Transaction.objects.create(wallet=wallet, amount=50, transaction_type='DEPOSIT', description='관리자 보정')
+    assert WalletService.monthly_totals(wallet.id)['DEPOSIT'] == (100, 1)  # 증분 갱신은 charge만
+
+    assert WalletService.rebuild_monthly_summary(wallet.id) == 1
+    assert WalletService.monthly_totals(wallet.id)['DEPOSIT'] == (150, 2)
+
+def test_history_pages_cover_every_row_once_across_created_at_ties(wallet):
+    for amount in range(1, 6):
+        Transaction.objects.create(wallet=wallet, amount=amount, transaction_type='DEPOSIT', description='')
+    Transaction.objects.filter(wallet=wallet).update(created_at=timezone.now())  # 전부 같은 시각
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = WalletService.history(wallet.id, cursor=cursor, limit=2)
+        seen += [r['id'] for r in rows]
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert seen == sorted(Transaction.objects.values_list('id', flat=True), reverse=True)  # 중복/누락 없음